@@ -0,0 +1,66 @@
+"""A bot-shaped object with the real database, writer and currency layers, for the benchmark scripts.
+
+Only the parts of `GrootBot` the storage code touches are built; nothing connects to Discord,
+but the bot's requirements (discord.py, aiosqlite) have to be installed.
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from utils.cache import CacheManager  # noqa: E402
+from utils.db import Database, DatabaseWriter  # noqa: E402
+from utils.leaderboard import Leaderboard  # noqa: E402
+from utils.ledger import Ledger  # noqa: E402
+from utils.migrations import migrate  # noqa: E402
+from utils.transfer import TransferEngine  # noqa: E402
+from utils.useful import currencyData  # noqa: E402
+
+
+@asynccontextmanager
+async def make_bot(*, accounts=0, wallet=200, readers=2, users_cache=50000, ledger_rows=500):
+    """Yields the bot with `accounts` currency accounts (user IDs 1 to `accounts`) in a fresh
+    temporary database. The database is removed afterwards."""
+    directory = tempfile.mkdtemp(prefix="groot-bench-")
+    path = os.path.join(directory, "main.sqlite3")
+    db = await Database.connect(path, readers=0)
+    await migrate(db.connection)
+    if accounts:
+        await db.connection.executemany(
+            "INSERT INTO currency_data (user_id, wallet) VALUES (?, ?)",
+            ((user_id, wallet) for user_id in range(1, accounts + 1)),
+        )
+        await db.connection.commit()
+    await db.close()
+
+    db = await Database.connect(path, readers=readers)
+    bot = SimpleNamespace(db=db)
+    bot.writer = DatabaseWriter(db.connection, recorder=db.recorder)
+    bot.writer.start()
+    bot.cache = CacheManager({"users": {"maxsize": users_cache, "ttl": 1800}, "inventories": {"maxsize": users_cache}})
+    bot.ledger = Ledger(bot, max_rows=ledger_rows)
+    bot.leaderboard = Leaderboard()
+    bot.data = currencyData(bot)
+    bot.bank = TransferEngine(bot.data)
+    try:
+        yield bot
+    finally:
+        await bot.writer.close()
+        await db.close()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
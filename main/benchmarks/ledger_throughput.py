@@ -0,0 +1,80 @@
+"""Measures how fast the economy ledger is written, against one INSERT per change.
+
+Run from anywhere: python main/benchmarks/ledger_throughput.py [--rows 100000] [--batches 100 500 5000]
+Changes arrive in bursts of `--burst` rows, like the commands that make them, with the event loop
+running in between so the ledger's background flushes can interleave. Every run also replays the
+ledger into `currency_data` and checks the result.
+"""
+import argparse
+import asyncio
+import random
+
+from harness import Timer, make_bot
+
+from utils.ledger import Ledger, replay
+
+ACCOUNTS = 10000
+
+
+def changes(rows, seed=0):
+    rng = random.Random(seed)
+    return [(rng.randint(1, ACCOUNTS), rng.randint(-50, 50) or 1) for _ in range(rows)]
+
+
+async def ledger(bot, rows, burst):
+    for start in range(0, len(rows), burst):
+        for user_id, delta in rows[start:start + burst]:
+            bot.ledger.record(user_id, "wallet", delta, "bench")
+        await asyncio.sleep(0)
+    if bot.ledger._pending is not None:
+        await bot.ledger._pending
+    await bot.ledger.flush()
+
+
+async def per_row(bot, rows, burst):
+    """One INSERT for every change, each its own write job (the writer still group-commits them)."""
+    writes = []
+    for start in range(0, len(rows), burst):
+        for user_id, delta in rows[start:start + burst]:
+            row = (user_id, "wallet", delta, "bench", None, 0)
+            writes.append(asyncio.ensure_future(bot.writer.execute(Ledger.INSERT, row)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*writes)
+
+
+async def run(rows, burst, batch=None):
+    async with make_bot(accounts=ACCOUNTS, wallet=1000, ledger_rows=batch or 500) as bot:
+        with Timer() as timer:
+            if batch is None:
+                await per_row(bot, rows, burst)
+            else:
+                await ledger(bot, rows, burst)
+        path = (await (await bot.db.execute("PRAGMA database_list")).fetchone())[2]
+        loop = asyncio.get_event_loop()
+        with Timer() as replayed:
+            applied, _ = await loop.run_in_executor(None, replay, path)
+        async with bot.db.execute("SELECT sum(wallet) FROM currency_data") as cur:
+            (total,) = await cur.fetchone()
+        assert applied == len(rows), (applied, len(rows))
+        assert total == ACCOUNTS * 1000 + sum(delta for _, delta in rows), total
+        return timer.elapsed, bot.ledger.flushes, replayed.elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batches", type=int, nargs="+", default=[100, 500, 5000], help="ledger max_rows to try")
+    parser.add_argument("--burst", type=int, default=20, help="rows recorded between two yields")
+    args = parser.parse_args()
+    rows = changes(args.rows)
+    print(f"{args.rows:,} ledger rows")
+    print(f"{'':>22} {'rows/s':>10} {'inserts':>8} {'replay':>9}")
+    elapsed, _, replayed = await run(rows, args.burst)
+    print(f"{'one INSERT per change':>22} {args.rows / elapsed:>10,.0f} {args.rows:>8,} {replayed:>8.2f}s")
+    for batch in args.batches:
+        elapsed, flushes, replayed = await run(rows, args.burst, batch)
+        print(f"{f'ledger, max_rows={batch}':>22} {args.rows / elapsed:>10,.0f} {flushes:>8,} {replayed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
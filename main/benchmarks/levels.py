@@ -0,0 +1,59 @@
+"""Compares `currencyData.add_exp` with the per-user loop `Currency.levels` used to run.
+
+Run from anywhere: python main/benchmarks/levels.py [--sizes 1000 10000 100000] [--cold]
+With --cold the accounts are not in the users cache yet and have to be loaded from the database.
+"""
+import argparse
+import asyncio
+import random
+
+from harness import Timer, make_bot
+
+
+async def old_levels(data, pending):
+    """`Currency.levels` before the batched pass: one level per tick at most."""
+    for user in pending:
+        await data.update_data(user, pending[user], mode="exp")
+        await data.update_data(user, pending[user] * 100, mode="max_bank")
+
+        if (
+            await data.get_data(user, mode="exp")
+            > (lvl := await data.get_data(user, mode="lvl") + 1) * 100
+        ):
+            await data.update_data(user, 1, mode="lvl")
+            await data.update_data(user, 0.01, mode="boost")
+            data.bot.cache["users"][user]["boost"] = round(await data.get_data(user, mode="boost"), 2)
+
+
+async def run(size, cold, new):
+    pending = {user_id: random.randint(1, 250) for user_id in range(1, size + 1)}
+    async with make_bot(accounts=size, users_cache=max(50000, size), ledger_rows=10 ** 9) as bot:
+        if not cold:
+            await bot.data.get_accounts(list(pending))
+        with Timer() as timer:
+            if new:
+                await bot.data.add_exp(dict(pending))
+            else:
+                await old_levels(bot.data, pending)
+        if new:
+            for user_id, exp in pending.items():
+                account = await bot.data.get_account(user_id)
+                assert account["exp"] == exp and account["lvl"] == max(0, (exp - 1) // 100), user_id
+        return timer.elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--cold", action="store_true")
+    args = parser.parse_args()
+    random.seed(0)
+    print(f"{'pending users':>14} {'old loop':>10} {'add_exp':>10} {'speedup':>8}")
+    for size in args.sizes:
+        old = await run(size, args.cold, new=False)
+        new = await run(size, args.cold, new=True)
+        print(f"{size:>14,} {old * 1000:>8.1f}ms {new * 1000:>8.1f}ms {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
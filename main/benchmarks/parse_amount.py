@@ -0,0 +1,155 @@
+"""Fuzzes `parse_amount` and compares it with the eval based `convert_to_int` it replaced.
+
+Run from anywhere: python main/benchmarks/parse_amount.py [--cases 100000] [--seed 0]
+Checks that
+  * both agree on what the old function got right: integers, `1,000`, `5k`, `2e6`, `max`/`all`,
+  * decimals, `m`/`b` suffixes, percentages and `half` give the exact value,
+  * random and hostile input only ever returns an int between 0 and MAX_AMOUNT or raises
+    BadArgument, and takes about as long as any other input.
+Then times both on the same inputs. Exits with 1 if a check fails.
+"""
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from decimal import Decimal
+from fractions import Fraction
+
+import harness  # noqa: F401  (puts the bot on the path)
+from discord.ext import commands
+
+from utils.useful import MAX_AMOUNT, parse_amount
+
+SUFFIXES = {"": 1, "k": 10**3, "m": 10**6, "b": 10**9}
+HOSTILE = ["9e9999", "9" * 10000, "1e999999999", "1" + "k" * 5000, "(" * 1000, "__import__('os')", "max" * 100, "%", ""]
+
+
+def old_convert(amount, max_amt):
+    """`convert_to_int` before the parser, minus the `async`."""
+    amount = amount.replace("max", f"{max_amt}")
+    amount = amount.replace("all", f"{max_amt}")
+    amount = re.sub(r"[^0-9ekEK.]", r"", amount)
+    amount = amount.replace(".0", "")
+    amount = amount.replace("k", "*1000")
+    amount = amount.replace("e", "*10**")
+    try:
+        return int(eval(amount))
+    except Exception:
+        raise commands.BadArgument("That is not a valid amount!")
+
+
+def shared(rng):
+    """An input both functions should read the same, with the max to use."""
+    max_amt = rng.randint(0, 10**7)
+    number = rng.randint(0, 10**9)
+    kind = rng.randrange(5)
+    if kind == 0:
+        return str(number), max_amt
+    if kind == 1:
+        return f"{number:,}", max_amt
+    if kind == 2:
+        return f"{rng.randint(0, 10**6)}k", max_amt
+    if kind == 3:
+        return f"{rng.randint(0, 999)}e{rng.randint(0, 9)}", max_amt
+    return rng.choice(("max", "all")), max_amt
+
+
+def exact(rng):
+    """An input only the new parser supports, with the max to use and the value it should give."""
+    max_amt = rng.randint(0, 10**7)
+    whole = rng.randint(0, 9999)
+    decimals = "".join(rng.choices(string.digits, k=rng.randint(0, 4)))
+    number = f"{whole}.{decimals}" if decimals or rng.random() < 0.1 else str(whole)
+    kind = rng.randrange(4)
+    if kind == 0:
+        suffix = rng.choice(tuple(SUFFIXES))
+        return f"{number}{suffix.upper() if rng.random() < 0.3 else suffix}", max_amt, int(Decimal(number) * SUFFIXES[suffix])
+    if kind == 1:
+        exponent = rng.randint(0, 6)
+        return f"{number}e{exponent}", max_amt, int(Decimal(number) * 10**exponent)
+    if kind == 2:
+        percent = Decimal(rng.randint(0, 100)) if rng.random() < 0.5 else Decimal(rng.randint(0, 9999)) / 100
+        return f"{percent}%", max_amt, int(Fraction(percent) * max_amt / 100)
+    return " HALF ", max_amt, max_amt // 2
+
+
+def garbage(rng):
+    alphabet = string.digits * 3 + ".eEkKmMbB%,_ -+*()⛻" + string.ascii_letters
+    return "".join(rng.choices(alphabet, k=rng.randint(0, 40))), rng.randint(0, 10**9)
+
+
+def new_or_error(text, max_amt):
+    try:
+        return parse_amount(text, max_amt)
+    except commands.BadArgument:
+        return commands.BadArgument
+
+
+def fuzz(rng, cases):
+    errors = []
+    for _ in range(cases):
+        text, max_amt = shared(rng)
+        old, new = old_convert(text, max_amt), new_or_error(text, max_amt)
+        if old != new:
+            errors.append(f"{text!r} (max {max_amt}): old {old}, new {new}")
+
+        text, max_amt, expected = exact(rng)
+        if (new := new_or_error(text, max_amt)) != expected:
+            errors.append(f"{text!r} (max {max_amt}): got {new}, expected {expected}")
+
+    slowest = 0, None
+    for text, max_amt in [garbage(rng) for _ in range(cases)] + [(text, 10**9) for text in HOSTILE]:
+        start = time.perf_counter()
+        try:
+            value = parse_amount(text, max_amt)
+        except commands.BadArgument:
+            value = None
+        except Exception as e:
+            errors.append(f"{text[:40]!r}: raised {e!r}")
+            continue
+        if text in HOSTILE:
+            slowest = max(slowest, (time.perf_counter() - start, text))
+        if value is not None and not (isinstance(value, int) and 0 <= value <= MAX_AMOUNT):
+            errors.append(f"{text[:40]!r}: returned {value!r}")
+    return errors, slowest
+
+
+def per_call(func, inputs, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text, max_amt in inputs:
+            try:
+                func(text, max_amt)
+            except commands.BadArgument:
+                pass
+        best = min(best, time.perf_counter() - start)
+    return best / len(inputs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    errors, (slowest, text) = fuzz(rng, args.cases)
+    print(f"{args.cases:,} cases of each kind, slowest hostile input {text[:20]!r} took {slowest * 1e6:.0f}µs")
+    for error in errors[:20]:
+        print(error)
+    if errors:
+        print(f"{len(errors)} failures")
+        sys.exit(1)
+
+    inputs = [shared(rng) for _ in range(20000)]
+    print(f"{'':>12} {'old':>9} {'new':>9}")
+    print(f"{'typical':>12} {per_call(old_convert, inputs):>7.2f}µs {per_call(parse_amount, inputs):>7.2f}µs")
+    hostile = [("9e9999", 10**9)] * 20
+    print(f"{'9e9999':>12} {per_call(old_convert, hostile):>7.2f}µs {per_call(parse_amount, hostile):>7.2f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Checks `PrefixMatcher` against the per-message regexes it replaced and times both.
+
+Run from anywhere: python main/benchmarks/prefix_corpus.py [--messages N]
+Exits with status 1 on the first message where the results differ. A second matcher also
+has the bot's mention registered and must find it in front of the messages that start with it.
+"""
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from utils.prefix import PrefixMatcher  # noqa: E402
+
+BOT_ID = 812395879146717214
+
+PREFIXES = [
+    "g.", "G.", "!", "?", "$", "g..", ">>", "groot ", "gr", ".", "*", "+", "(", "[", "\\",
+    "^", "|", "hey groot,", "é", "ß", "İ", "🌳", "a b", "--", "g", "?!",
+]
+
+
+def old_prefix(prefix, content):
+    """`GrootBot.get_prefix` before the matcher."""
+    comp = re.compile(f"^({re.escape(prefix)}).*", flags=re.I)
+    match = comp.match(content)
+    if match is not None:
+        return match.group(1)
+    return prefix
+
+
+def old_is_mention(content, user_id):
+    """`launcher.on_message` before the matcher."""
+    return re.fullmatch(f"<@(!)?{user_id}>", content) is not None
+
+
+def corpus(prefixes, size, seed=0):
+    rng = random.Random(seed)
+    bodies = ["help", "bal", "", " ", "tag hello", "\n", "slots 50%", "ping"]
+    for _ in range(size):
+        prefix = rng.choice(prefixes)
+        variant = rng.choice((prefix, prefix.upper(), prefix.lower(), prefix.swapcase()))
+        choice = rng.random()
+        if choice < 0.5:
+            content = variant + rng.choice(bodies)
+        elif choice < 0.6:
+            content = rng.choice((f"<@{BOT_ID}>", f"<@!{BOT_ID}>", f"<@{BOT_ID}> ", f"<@{BOT_ID + 1}>", f" <@!{BOT_ID}>"))
+        elif choice < 0.7:
+            content = variant[:-1] + rng.choice(bodies)
+        else:
+            content = "".join(rng.choices(string.printable + "éßİ🌳", k=rng.randint(0, 12)))
+        yield prefix, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+
+    messages = list(corpus(PREFIXES, args.messages))
+    matcher = PrefixMatcher()
+    for i, prefix in enumerate(PREFIXES):
+        matcher.set(i, prefix)
+    ids = {prefix: i for i, prefix in enumerate(PREFIXES)}
+    mentioned = PrefixMatcher()
+    for i, prefix in enumerate(PREFIXES):
+        mentioned.set(i, prefix)
+    mentioned.set_mention(BOT_ID)
+    mention_prefix = re.compile(rf"<@!?{BOT_ID}>\s*")
+
+    for prefix, content in messages:
+        snowflake_id = ids[prefix]
+        new = matcher.match(snowflake_id, content) or matcher.get(snowflake_id)[0]
+        if new != old_prefix(prefix, content):
+            print(f"prefix mismatch for {prefix!r} on {content!r}: {new!r} != {old_prefix(prefix, content)!r}")
+            return 1
+        mention = mention_prefix.match(content)
+        expected = mention.group() if mention else matcher.match(snowflake_id, content)
+        if mentioned.match(snowflake_id, content) != expected:
+            print(f"mention prefix mismatch for {prefix!r} on {content!r}")
+            return 1
+        if matcher.is_mention(content, BOT_ID) != old_is_mention(content, BOT_ID):
+            print(f"mention mismatch on {content!r}")
+            return 1
+
+    start = time.perf_counter()
+    for prefix, content in messages:
+        old_prefix(prefix, content)
+        old_is_mention(content, BOT_ID)
+    old = time.perf_counter() - start
+    start = time.perf_counter()
+    for prefix, content in messages:
+        snowflake_id = ids[prefix]
+        matcher.match(snowflake_id, content) or matcher.get(snowflake_id)[0]
+        matcher.is_mention(content, BOT_ID)
+    new = time.perf_counter() - start
+
+    print(f"{len(messages):,} messages, {len(PREFIXES)} prefixes: results identical")
+    print(f"old regexes   {old / len(messages) * 1e6:.2f} us/message")
+    print(f"PrefixMatcher {new / len(messages) * 1e6:.2f} us/message")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Mixed read/write throughput of the read pool and group-commit writer against one connection.
+
+Run from anywhere: python main/benchmarks/read_pool.py [--clients 50] [--ops 200] [--writes 0.1] [--readers 4]
+The single connection is how the bot used to talk to SQLite: every statement on the same
+connection, a commit after every write. The database is created under $TMPDIR; point that at
+the disk the bot runs on, commits cost little on a tmpfs. On a single core the readers can't run
+in parallel, so compare the read latencies there rather than the throughput.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from harness import Timer, make_bot
+
+from utils.db import percentile
+
+ACCOUNTS = 20000
+READS = (
+    ("SELECT * FROM currency_data WHERE user_id = ?", True),
+    ("SELECT user_id, wallet + bank FROM currency_data ORDER BY wallet + bank DESC LIMIT 10", False),
+    ("WITH rich AS (SELECT wallet FROM currency_data WHERE wallet > ?) SELECT count(*) FROM rich", True),
+)
+WRITES = (
+    "UPDATE currency_data SET wallet = wallet + 1 WHERE user_id = ?",
+    "WITH one AS (SELECT ? AS id) UPDATE currency_data SET bank = bank + 1 WHERE user_id IN (SELECT id FROM one)",
+)
+
+
+def workload(clients, ops, writes):
+    rng = random.Random(0)
+    jobs = []
+    for _ in range(clients):
+        client = []
+        for _ in range(ops):
+            key = rng.randint(1, ACCOUNTS)
+            if rng.random() < writes:
+                client.append((rng.choice(WRITES), (key,), True))
+            else:
+                sql, takes_key = rng.choice(READS)
+                client.append((sql, (key,) if takes_key else (), False))
+        jobs.append(client)
+    return jobs
+
+
+async def pooled(bot, client, latencies):
+    for sql, params, write in client:
+        start = time.perf_counter()
+        if write:
+            await bot.writer.execute(sql, params)
+        else:
+            async with bot.db.execute(sql, params) as cur:
+                await cur.fetchall()
+        latencies[write].append(time.perf_counter() - start)
+
+
+async def single(bot, client, latencies):
+    connection = bot.db.connection
+    for sql, params, write in client:
+        start = time.perf_counter()
+        cur = await connection.execute(sql, params)
+        if write:
+            await connection.commit()
+        else:
+            await cur.fetchall()
+        await cur.close()
+        latencies[write].append(time.perf_counter() - start)
+
+
+async def run(jobs, readers, new):
+    latencies = {False: [], True: []}
+    async with make_bot(accounts=ACCOUNTS, readers=readers if new else 0) as bot:
+        with Timer() as timer:
+            await asyncio.gather(*((pooled if new else single)(bot, client, latencies) for client in jobs))
+        async with bot.db.execute("SELECT sum(wallet) + sum(bank) FROM currency_data") as cur:
+            (total,) = await cur.fetchone()
+        writes = sum(write for client in jobs for *_, write in client)
+        assert total == ACCOUNTS * 400 + writes, (total, writes)
+        return timer.elapsed, latencies
+
+
+def report(name, total, elapsed, latencies):
+    line = f"{name:>18} {total / elapsed:>8,.0f} ops/s"
+    for kind, samples in (("read", latencies[False]), ("write", latencies[True])):
+        if samples:
+            p50, p99 = (percentile(samples, pct) * 1000 for pct in (50, 99))
+            line += f"  {kind} p50 {p50:>6.2f}ms p99 {p99:>7.2f}ms"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--writes", type=float, default=0.1, help="share of the operations that write")
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    jobs = workload(args.clients, args.ops, args.writes)
+    total = args.clients * args.ops
+    print(f"{total:,} operations from {args.clients} clients, {args.writes:.0%} writes")
+    report("single connection", total, *await run(jobs, args.readers, new=False))
+    report("pool + writer", total, *await run(jobs, args.readers, new=True))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
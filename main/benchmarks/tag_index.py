@@ -0,0 +1,98 @@
+"""Compares tag lookups through `TagIndex` with the queries `Tags.tag` used to run, at 10k tags per guild.
+
+Run from anywhere: python main/benchmarks/tag_index.py [--tags 10000] [--lookups 2000]
+A miss used to cost the exact-match query plus a `tag_name LIKE '%name%'` scan over the guild's
+tags; the index answers it from memory with trigram suggestions. Misses are made by changing one
+letter of an existing name, and "found" counts how often that name was among the suggestions.
+"""
+import argparse
+import asyncio
+import random
+import string
+
+from harness import Timer, make_bot
+
+from utils.tagindex import TagIndex
+
+GUILD = 1
+CONTENT = "SELECT tag_content FROM tags WHERE tag_guild_id = ? AND tag_name = ?"
+LIKE = "SELECT tag_name FROM tags WHERE tag_guild_id = ? AND tag_name LIKE ?"
+
+
+def tag_names(rng, amount):
+    names = set()
+    while len(names) < amount:
+        names.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12))))
+    return sorted(names)
+
+
+def typo(rng, name):
+    letters = list(name)
+    letters[rng.randrange(len(letters))] = rng.choice(string.ascii_lowercase)
+    return "".join(letters)
+
+
+async def old_lookup(db, name):
+    async with db.execute(CONTENT, (GUILD, name)) as cur:
+        if (row := await cur.fetchone()) is not None:
+            return row[0], []
+    async with db.execute(LIKE, (GUILD, f"%{name}%")) as cur:
+        return None, [row[0] for row in await cur.fetchall()]
+
+
+async def new_lookup(index, name):
+    if (content := await index.get(GUILD, name)) is not None:
+        return content, []
+    return None, await index.suggest(GUILD, name)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tags", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    names = tag_names(rng, args.tags)
+    hits = [rng.choice(names) for _ in range(args.lookups)]
+    misses = [(name, typo(rng, name)) for name in (rng.choice(names) for _ in range(args.lookups))]
+    misses = [(name, wrong) for name, wrong in misses if wrong != name]
+
+    async with make_bot() as bot:
+        # other guilds' tags share the table and the index
+        rows = [
+            (guild_id, name, f"content of {name}", 0)
+            for guild_id in (GUILD, 2, 3)
+            for name in names
+        ]
+        await bot.db.executemany(
+            "INSERT INTO tags (tag_guild_id, tag_name, tag_content, tag_author) VALUES (?, ?, ?, ?)", rows
+        )
+        await bot.db.commit()
+        index = TagIndex(
+            bot.db,
+            bot.writer,
+            bot.cache.namespace("tag_contents", maxsize=20000, ttl=3600),
+            bot.cache.namespace("tag_indexes", maxsize=500, ttl=3600),
+        )
+        with Timer() as load:
+            await index.guild(GUILD)
+        print(f"{args.tags:,} tags per guild, loading the guild's index took {load.elapsed * 1000:.1f}ms")
+        print(f"{'':>8} {'old':>10} {'index':>10} {'found (old)':>12} {'found (index)':>14}")
+
+        for label, lookups in (("hits", [(name, name) for name in hits]), ("typos", misses)):
+            results = {}
+            for func, target in ((old_lookup, bot.db), (new_lookup, index)):
+                found = 0
+                with Timer() as timer:
+                    for name, query in lookups:
+                        content, suggestions = await func(target, query)
+                        found += content is not None or name in suggestions
+                results[func] = timer.elapsed / len(lookups), found / len(lookups)
+            (old, old_found), (new, new_found) = results[old_lookup], results[new_lookup]
+            print(
+                f"{label:>8} {old * 1e6:>8.0f}µs {new * 1e6:>8.0f}µs {old_found:>12.0%} {new_found:>14.0%}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
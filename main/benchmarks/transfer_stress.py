@@ -0,0 +1,119 @@
+"""Runs thousands of overlapping transfers through `TransferEngine` and checks that no money is
+created or lost and that no wallet ever goes below zero.
+
+Run from anywhere: python main/benchmarks/transfer_stress.py [--accounts 500] [--transfers 20000] [--cache 100] [--racy-loads]
+The users cache is kept smaller than the amount of accounts so transfers also race account loads
+and evictions, and a flush loop writes the dirty accounts while the transfers run. Exits with 1
+if a check fails. --racy-loads lets several loads of one account run at once, the way
+`currencyData.get_account` used to; that run is expected to fail.
+"""
+import argparse
+import asyncio
+import random
+import sys
+
+from harness import Timer, make_bot
+
+from utils.transfer import InsufficientFunds
+from utils.useful import currencyData
+
+WALLET = 200
+
+
+async def racy_load(loading, user_id, load):
+    """`currencyData._load` without the once-at-a-time part."""
+    return await load(user_id)
+
+
+async def flush_loop(bot, stop):
+    while not stop.is_set():
+        await bot.data.flush()
+        await asyncio.sleep(0.005)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--transfers", type=int, default=20000)
+    parser.add_argument("--cache", type=int, default=100, help="size of the users cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--racy-loads", action="store_true", help="load accounts without single-flight")
+    args = parser.parse_args()
+    if args.racy_loads:
+        currencyData._load = staticmethod(racy_load)
+    rng = random.Random(args.seed)
+    errors = []
+    adjusted = 0
+
+    async with make_bot(accounts=args.accounts, wallet=WALLET, users_cache=args.cache) as bot:
+
+        async def transfer(sender, receiver, amount):
+            await asyncio.sleep(0)
+            try:
+                balances = await bot.bank.transfer(sender, receiver, amount)
+            except InsufficientFunds:
+                return
+            if min(balances) < 0:
+                errors.append(f"transfer {sender} -> {receiver} left {balances}")
+
+        async def adjust(user_id, amount):
+            nonlocal adjusted
+            await asyncio.sleep(0)
+            try:
+                balance = await bot.bank.adjust(user_id, amount)
+            except InsufficientFunds:
+                return
+            adjusted += amount
+            if balance < 0:
+                errors.append(f"adjusting {user_id} by {amount} left {balance}")
+
+        jobs = []
+        for _ in range(args.transfers):
+            sender, receiver = rng.sample(range(1, args.accounts + 1), 2)
+            if rng.random() < 0.05:
+                jobs.append(adjust(sender, rng.randint(-WALLET, WALLET)))
+            else:
+                jobs.append(transfer(sender, receiver, rng.randint(1, WALLET)))
+
+        stop = asyncio.Event()
+        flusher = asyncio.ensure_future(flush_loop(bot, stop))
+        with Timer() as timer:
+            await asyncio.gather(*jobs)
+        stop.set()
+        await flusher
+        await bot.data.flush()
+        await bot.ledger.flush()
+
+        async with bot.db.execute("SELECT sum(wallet), min(wallet), count(*) FROM currency_data") as cur:
+            total, lowest, accounts = await cur.fetchone()
+        async with bot.db.execute(
+            "SELECT count(*) FROM currency_data AS c WHERE wallet != ? + "
+            "(SELECT COALESCE(sum(delta), 0) FROM economy_ledger WHERE user_id = c.user_id AND field = 'wallet')",
+            (WALLET,),
+        ) as cur:
+            (unbalanced,) = await cur.fetchone()
+
+    expected = args.accounts * WALLET + adjusted
+    if total != expected:
+        errors.append(f"wallets add up to {total:,}, expected {expected:,}")
+    if lowest < 0:
+        errors.append(f"lowest wallet is {lowest:,}")
+    if unbalanced:
+        errors.append(f"{unbalanced} wallets don't match their ledger rows")
+
+    done = bot.bank.transfers
+    print(
+        f"{args.transfers:,} operations on {accounts:,} accounts in {timer.elapsed:.2f}s "
+        f"({args.transfers / timer.elapsed:,.0f}/s): {done:,} applied, {bot.bank.rejected:,} rejected"
+    )
+    for error in errors[:10]:
+        print(error)
+    if len(errors) > 10:
+        print(f"... and {len(errors) - 10} more")
+    if errors:
+        sys.exit(1)
+    print("total conserved, no negative wallets")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,16 +5,25 @@ import itertools
 import logging
 import operator
 import os
-import re
 from pathlib import Path
 
 import aiohttp
-import aiosqlite
 import discord
 from discord.ext import commands, ipc
 
+from utils.backup import BackupScheduler
 from utils.cache import CacheManager
+from utils.catalog import ItemCatalog
+from utils.db import Database, DatabaseWriter, QueryRecorder, Statement
+from utils.gate import MessageGate
+from utils.json_loader import read_json
+from utils.leaderboard import Leaderboard
+from utils.ledger import Ledger
+from utils.migrations import migrate
+from utils.prefix import PrefixMatcher
+from utils.probe import DatabaseProbe
 from utils.subclasses import customContext
+from utils.transfer import TransferEngine
 from utils.useful import (Cooldown, ListCall, call, currencyData,
                           print_exception)
 
@@ -22,14 +31,23 @@ to_call = ListCall()
 
 
 class GrootBot(commands.Bot):
+    # bumped whenever commands or cogs are added or removed, the help command caches on it
+    commands_version = 0
+
     def __init__(self, **kwargs):
         super().__init__(self.get_prefix, **kwargs)
         self.greenTick = "<:greenTick:814504388139155477>"
         self.redTick = "<:redTick:814774960852566026>"
-        self.data = currencyData(self)
         self.token = kwargs.pop("token", None)
         self.session = aiohttp.ClientSession
-        self.cache = CacheManager()
+        self.cache = CacheManager(read_json("config").get("cache"))
+        self.data = currencyData(self)
+        self.bank = TransferEngine(self.data)
+        self.ledger = Ledger(self)
+        self.leaderboard = Leaderboard(guilds_of=self.guilds_of)
+        self.catalog = ItemCatalog(self)
+        self.prefixes = PrefixMatcher(self.cache.setdefault("prefix", {}))
+        self.gate = MessageGate(self)
         self.ipc = ipc.Server(
             self, host="0.0.0.0", secret_key="GrootBotAdmin"
         )
@@ -42,6 +60,7 @@ class GrootBot(commands.Bot):
     def add_command(self, command):
         """Overwrite add_command to add a default cooldown to every command"""
         super().add_command(command)
+        self.commands_version += 1
         command.cooldown_after_parsing = True
 
         if (
@@ -50,6 +69,10 @@ class GrootBot(commands.Bot):
         ):
             command.checks.append(Cooldown(1, 3, 1, 1, commands.BucketType.user))
 
+    def remove_command(self, name):
+        self.commands_version += 1
+        return super().remove_command(name)
+
     @property
     def cwd(self):
         return str(Path(__file__).parents[0])
@@ -122,30 +145,70 @@ class GrootBot(commands.Bot):
         #}
         self.cache["users"] = {}
 
+    async def load_prefix(self, snowflake_id):
+        """Loads the prefixes of a guild (or DM user) into the prefix matcher, if they are not there yet."""
+        if snowflake_id not in self.prefixes:
+            query = "SELECT prefix FROM guild_prefixes WHERE guild_id = ? ORDER BY rowid"
+            cur = await self.db.execute(query, (snowflake_id,))
+            data = await cur.fetchall()
+            self.prefixes.set(snowflake_id, [row[0] for row in data])
+        return self.prefixes.get(snowflake_id)
+
+    async def save_prefixes(self, guild_id, prefixes):
+        """Replaces the prefixes of a guild, the first one is the one shown in messages."""
+        prefixes = tuple(prefixes)
+        await self.writer.transaction((
+            Statement(
+                "INSERT INTO guild_config (guild_id, prefix) VALUES (?, ?) ON CONFLICT (guild_id) DO UPDATE SET prefix = ?",
+                (guild_id, prefixes[0], prefixes[0]),
+            ),
+            Statement("DELETE FROM guild_prefixes WHERE guild_id = ?", (guild_id,)),
+            Statement(
+                "INSERT INTO guild_prefixes (guild_id, prefix) VALUES (?, ?)",
+                [(guild_id, prefix) for prefix in prefixes],
+                True,
+            ),
+        ))
+        return self.prefixes.set(guild_id, prefixes)
+
+    @to_call.append
+    async def load_catalog(self):
+        """Loads the shop items into the item catalog."""
+        await self.catalog.refresh()
+
+    def guilds_of(self, user_id):
+        """IDs of the guilds the member cache knows `user_id` is in."""
+        return [guild.id for guild in self.guilds if guild.get_member(user_id) is not None]
+
+    @to_call.append
+    async def load_leaderboard(self):
+        """Builds the leaderboards from every currency account."""
+        accounts = []
+        async with self.db.execute("SELECT * FROM currency_data") as cur:
+            async for row in cur:
+                accounts.append((row[0], dict(zip(currencyData.FIELDS, row[1:8]))))
+        self.leaderboard.load(accounts)
+
     async def get_prefix(self, message):
         """Handles custom prefixes, this function is invoked every time process_command method is invoke thus returning
         the appropriate prefixes depending on the guild."""
-        query = "SELECT prefix FROM guild_config WHERE guild_id=?"
         snowflake_id = message.guild.id if message.guild else message.author.id
-        self.cache.setdefault("prefix", {})
-        if not (prefix := self.cache["prefix"].get(snowflake_id)):
-            cur = await self.db.execute(query, (snowflake_id,))
-            data = await cur.fetchone()
-            data = data if data else ["g."]
-            prefix = self.cache["prefix"].setdefault(snowflake_id, data[0])
-
-        comp = re.compile(f"^({re.escape(prefix)}).*", flags=re.I)
-        match = comp.match(message.content)
-        if match is not None:
-            return match.group(1)
-        return prefix
+        prefixes = await self.load_prefix(snowflake_id)
+        return self.prefixes.match(snowflake_id, message.content) or prefixes[0]
 
     def add_cog(self, cog: commands.Cog, category: str = "Unlisted"):
         if not category in self.categories:
             self.categories[category] = set()
 
         self.categories[category].add(cog.__cog_name__)
+        self.commands_version += 1
         super().add_cog(cog)
+
+    def remove_cog(self, name):
+        for cogs in self.categories.values():
+            cogs.discard(name)
+        self.commands_version += 1
+        super().remove_cog(name)
         
     def get_message(self, message_id):
         """Gets the message from the cache"""
@@ -159,8 +222,13 @@ class GrootBot(commands.Bot):
     def starter(self):
         """Starts the bot properly"""
         try:
+            config = read_json("config").get("database", {})
             db = self.loop.run_until_complete(
-                aiosqlite.connect(f"{self.cwd}/data/main.sqlite3")
+                Database.connect(
+                    f"{self.cwd}/data/main.sqlite3",
+                    readers=config.get("read_pool_size", 4),
+                    recorder=QueryRecorder(slow_threshold=config.get("slow_query_ms", 100) / 1000),
+                )
             )
         except Exception as e:
             print_exception("Could not connect to database:", e)
@@ -168,6 +236,36 @@ class GrootBot(commands.Bot):
         else:
             self.launch_time = datetime.datetime.utcnow()
             self.db = db
+            self.writer = DatabaseWriter(
+                db.connection,
+                batch_size=config.get("writer_batch_size", 64),
+                max_delay=config.get("writer_max_delay", 0.005),
+                recorder=db.recorder,
+            )
+            self.loop.run_until_complete(migrate(db.connection))
+            self.writer.start(self.loop)
+            self.ledger.max_rows = config.get("ledger_max_rows", 500)
+            self.ledger.interval = config.get("ledger_interval", 2)
+            self.ledger.start(self.loop)
+            self.probe = DatabaseProbe(
+                db,
+                self.writer,
+                interval=config.get("probe_interval", 5),
+                samples=config.get("probe_samples", 720),
+            )
+            self.probe.start(self.loop)
+            backup = read_json("config").get("backup", {})
+            self.backups = BackupScheduler(
+                f"{self.cwd}/data/main.sqlite3",
+                self.writer,
+                directory=f"{self.cwd}/{backup.get('directory', 'data/backups')}",
+                interval=backup.get("interval_hours", 6) * 3600,
+                keep=backup.get("keep", 8),
+                compress=backup.get("compress", True),
+                pages_per_step=backup.get("pages_per_step", 256),
+                step_sleep=backup.get("step_sleep", 0.005),
+            )
+            self.backups.start(self.loop)
             self.loop.run_until_complete(self.after_db())
             try:
                 self.ipc.start()
@@ -177,6 +275,7 @@ class GrootBot(commands.Bot):
 
     # Events
     async def on_ready(self):
+        self.prefixes.set_mention(self.user.id)
         logging.warning(f"Logged in as {self.user}, SQLite3 database initialized.")
         print(f"Logged in as {self.user}")
 
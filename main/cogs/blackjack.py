@@ -22,12 +22,12 @@ class Blackjack(commands.Cog):
             raise commands.BadArgument(
                 f"{ctx.author.mention} You are too rich to gamble!"
             )
-        boost = round(self.bot.cache["users"][ctx.author.id]["boost"], 2)
+        boost = round(await self.data.get_data(ctx.author.id, mode="boost"), 2)
         if wallet == 0:
             raise commands.BadArgument(
                 f"{ctx.author.mention} You have no coins to gamble with."
             )
-        amount = await convert_to_int(amount, 500000)
+        amount = await convert_to_int(amount, min(wallet, 500000))
         if amount > 500000:
             raise commands.BadArgument(
                 f"{ctx.author.mention} You can't slots more than ⛻500,000 coins"
@@ -39,8 +39,23 @@ class Blackjack(commands.Cog):
                 )
             else:
                 amount = wallet
+        if amount < 1:
+            raise commands.BadArgument(
+                f"{self.bot.redTick} Amount must be a positive number!"
+            )
+        # The bet is held in escrow for the whole game, every way out of it pays something back
+        await self.bot.bank.adjust(ctx.author.id, -amount, reason="bet")
         ctx.amount = amount
         ctx.wallet = wallet
+        ctx.refund = amount
+        try:
+            return await self.play(ctx, amount, boost)
+        finally:
+            if ctx.refund:
+                await self.bot.bank.adjust(ctx.author.id, ctx.refund, reason="refund")
+
+    async def play(self, ctx, amount, boost):
+        """Plays the game with the bet already taken, `ctx.refund` is what gets paid back once it ends."""
         stood = False
         won = None
         deck = [
@@ -67,9 +82,14 @@ class Blackjack(commands.Cog):
             if not isinstance(status, int):
                 result = status["result"]
                 if result is True:
-                    await self.data.update_data(ctx.author.id, round(amount * boost))
+                    payout = amount + round(amount * boost)
                 elif result is False:
-                    await self.data.update_data(ctx.author.id, -amount)
+                    payout = 0
+                else:
+                    payout = amount
+                ctx.refund = 0
+                if payout:
+                    await self.bot.bank.adjust(ctx.author.id, payout, reason="payout")
                 em = await self.end(ctx, cards, status)
                 return await ctx.send(embed=em)
             else:
@@ -96,13 +116,13 @@ class Blackjack(commands.Cog):
                         stood = True
 
                     elif msg == "e":
-                        await self.data.update_data(ctx.author.id, -round(0.5 * amount))
+                        ctx.refund = amount - round(0.5 * amount)
                         return await ctx.maybe_reply(
                             "You ended the game. Half of your bet was lost."
                         )
                     else:
                         fail += 1
-        await self.data.update_data(ctx.author.id, -round(0.5 * amount))
+        ctx.refund = amount - round(0.5 * amount)
         return await ctx.maybe_reply(
             "You lost the game due to multiple invalid choices. Half of your bet was lost."
         )
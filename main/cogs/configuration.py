@@ -5,6 +5,8 @@ from discord.ext import commands
 from discord.ext.commands import guild_only, has_guild_permissions
 from utils.useful import RoleConvert
 
+MAX_PREFIXES = 10
+
 
 class Configuration(commands.Cog):
     def __init__(self, bot):
@@ -28,8 +30,7 @@ class Configuration(commands.Cog):
             self.bot.cache["tips_are_on"].discard(ctx.author.id)
 
         query = "UPDATE users_data SET tips = ? WHERE user_id = ?"
-        await self.bot.db.execute(query, (modus, ctx.author.id))
-        await self.bot.db.commit()
+        await self.bot.writer.execute(query, (modus, ctx.author.id))
         return await ctx.send(
             f"{self.bot.greenTick} Toggled your tips to `{mode.upper()}`"
         )
@@ -52,7 +53,7 @@ class Configuration(commands.Cog):
         row = await finder.fetchone()
         if row is None:
             query = "INSERT INTO guild_config (guild_id) VALUES (?)"
-            await self.bot.db.execute(query, (ctx.guild.id,))
+            await self.bot.writer.execute(query, (ctx.guild.id,))
             await ctx.send(
                 f"Seems like you are new! I added this server ({ctx.guild.name}), to our database. Enjoy!"
             )
@@ -63,24 +64,50 @@ class Configuration(commands.Cog):
         Sets the required role for starting giveaways to `role`
         """
         query = "INSERT INTO guild_config (guild_id, grole) VALUES (?, ?) ON CONFLICT (guild_id) DO UPDATE SET grole = ?"
-        await self.bot.db.execute(query, (ctx.guild.id, role.id, role.id))
-        await self.bot.db.commit()
+        await self.bot.writer.execute(query, (ctx.guild.id, role.id, role.id))
         await ctx.send(f"The role required for giveaways is now set to **{role.name}**")
 
-    @config.command(name="prefix", usage="<prefix>")
-    async def _setprefix(self, ctx, *, prefix: str):
+    @config.group(name="prefix", usage="[prefix]", invoke_without_command=True, case_insensitive=True)
+    async def _setprefix(self, ctx, *, prefix: str = None):
         """
-        Changes the bot prefix for this guild.\n
-        Only applicable if you are in a guild.
+        Changes the bot prefix for this guild, or shows the prefixes without `prefix`.\n
+        Use `config prefix add` and `config prefix remove` to have several. Mentioning me always works too.
         """
-        query = "INSERT INTO guild_config (guild_id, prefix) VALUES (?, ?) ON CONFLICT (guild_id) DO UPDATE SET prefix = ?"
-        await self.bot.db.execute(query, (ctx.guild.id, prefix, prefix))
-        await self.bot.db.commit()
-        self.bot.cache["prefix"][ctx.guild.id] = prefix
+        if prefix is None:
+            prefixes = ", ".join(f"`{prefix}`" for prefix in await self.bot.load_prefix(ctx.guild.id))
+            return await ctx.send(f"The prefixes for this server are {prefixes}, or mention me.")
+        await self.bot.save_prefixes(ctx.guild.id, (prefix,))
         await ctx.send(
             f"The prefix has been set to `{prefix}`. To change the prefix again, use `{prefix}config prefix <prefix>`"
         )
 
+    @_setprefix.command(name="add", usage="<prefix>")
+    async def _addprefix(self, ctx, *, prefix: str):
+        """
+        Adds `prefix` to the prefixes of this guild.
+        """
+        prefixes = await self.bot.load_prefix(ctx.guild.id)
+        if prefix.lower() in (p.lower() for p in prefixes):
+            raise commands.BadArgument(f"{self.bot.redTick} `{prefix}` already is a prefix here.")
+        if len(prefixes) >= MAX_PREFIXES:
+            raise commands.BadArgument(f"{self.bot.redTick} A server can't have more than {MAX_PREFIXES} prefixes.")
+        await self.bot.save_prefixes(ctx.guild.id, prefixes + (prefix,))
+        await ctx.send(f"{self.bot.greenTick} Added `{prefix}` to the prefixes.")
+
+    @_setprefix.command(name="remove", aliases=["delete"], usage="<prefix>")
+    async def _removeprefix(self, ctx, *, prefix: str):
+        """
+        Removes `prefix` from the prefixes of this guild.
+        """
+        prefixes = await self.bot.load_prefix(ctx.guild.id)
+        remaining = tuple(p for p in prefixes if p.lower() != prefix.lower())
+        if len(remaining) == len(prefixes):
+            raise commands.BadArgument(f"{self.bot.redTick} `{prefix}` is not a prefix here.")
+        if not remaining:
+            raise commands.BadArgument(f"{self.bot.redTick} That is the last prefix, set another one instead.")
+        await self.bot.save_prefixes(ctx.guild.id, remaining)
+        await ctx.send(f"{self.bot.greenTick} Removed `{prefix}` from the prefixes.")
+
     @commands.command(
         name="disable",
         brief="Disables a command for a server or channel",
@@ -107,13 +134,12 @@ class Configuration(commands.Cog):
             else " for this server"
         )
         try:
-            await self.bot.db.execute(query, (snowflake_id.id, command))
+            await self.bot.writer.execute(query, (snowflake_id.id, command))
         except Exception:
             raise commands.BadArgument(
                 f"{self.bot.redTick} That command is already disabled{txt}!"
             )
         else:
-            await self.bot.db.commit()
             try:
                 self.bot.cache["disabled_commands"][command].append(snowflake_id.id)
             except KeyError:
@@ -157,8 +183,7 @@ class Configuration(commands.Cog):
         else:
             query = "DELETE FROM disabled_commands WHERE snowflake_id = ? AND command_name = ?"
             self.bot.cache["disabled_commands"][command].remove(snowflake_id.id)
-            await self.bot.db.execute(query, (snowflake_id.id, command))
-            await self.bot.db.commit()
+            await self.bot.writer.execute(query, (snowflake_id.id, command))
             await ctx.send(f"{self.bot.greenTick} Enabled command `{command}`{txt}")
 
 
@@ -1,8 +1,10 @@
 import datetime as dt
+import logging
 
 import discord
 import humanize
 from discord.ext import commands, tasks
+from utils.db import Statement
 from utils.useful import Embed, Cooldown, send_traceback
 from utils.json_loader import read_json
 
@@ -78,17 +80,15 @@ class Core(commands.Cog):
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
-        query_a = "INSERT INTO guilds VALUES (?)"
-        await self.bot.db.execute(query_a, (guild.id,))
-        query_b = "INSERT INTO guild_config (guild_id) VALUES (?)"
-        await self.bot.db.execute(query_b, (guild.id,))
-        await self.bot.db.commit()
+        await self.bot.writer.transaction((
+            Statement("INSERT INTO guilds VALUES (?)", (guild.id,)),
+            Statement("INSERT INTO guild_config (guild_id) VALUES (?)", (guild.id,)),
+        ))
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild):
         query_c = "DELETE FROM guilds WHERE guild_id = ?"
-        await self.bot.db.execute(query_c, (guild.id,))
-        await self.bot.db.commit()
+        await self.bot.writer.execute(query_c, (guild.id,))
 
     @commands.Cog.listener()
     async def on_command(self, ctx):
@@ -109,45 +109,37 @@ class Core(commands.Cog):
             )
         )
 
-        for item in self.cache:
-            query_user_data = """
-                              INSERT INTO users_data (user_id, commands_ran) 
-                              VALUES ((?), ?)
-                              ON CONFLICT(user_id) DO UPDATE SET commands_ran = commands_ran+?
-                              """
-            await self.bot.db.execute(
-                query_user_data, (int(item), self.cache[item], self.cache[item])
-            )
-        self.cache = {}
-
-        for item in self.cache_usage:
-            query = """
-                    INSERT INTO usage (command, counter) 
-                    VALUES ((?), ?) 
-                    ON CONFLICT(command) DO UPDATE SET counter = counter+?
-                    """
-
-            await self.bot.db.execute(
-                query, (str(item), self.cache_usage[item], self.cache_usage[item])
-            )
-
-        self.cache_usage = {}
-        for user in self.bot.cache["users"]:
-            query = "UPDATE currency_data SET wallet = ?, bank = ?, max_bank = ?, boost = ?, exp = ?, lvl = ? WHERE user_id = ?"
-            await self.bot.db.execute(
-                query,
-                (
-                    self.bot.cache["users"][user]["wallet"],
-                    self.bot.cache["users"][user]["bank"],
-                    self.bot.cache["users"][user]["max_bank"],
-                    round(self.bot.cache["users"][user]["boost"], 2),
-                    self.bot.cache["users"][user]["exp"],
-                    self.bot.cache["users"][user]["lvl"],
-                    user,
-                ),
-            )
-
-        await self.bot.db.commit()
+        commands_ran, self.cache = self.cache, {}
+        usage, self.cache_usage = self.cache_usage, {}
+        query_user_data = """
+                          INSERT INTO users_data (user_id, commands_ran) 
+                          VALUES ((?), ?)
+                          ON CONFLICT(user_id) DO UPDATE SET commands_ran = commands_ran+?
+                          """
+        query_usage = """
+                      INSERT INTO usage (command, counter) 
+                      VALUES ((?), ?) 
+                      ON CONFLICT(command) DO UPDATE SET counter = counter+?
+                      """
+        try:
+            await self.bot.writer.transaction((
+                Statement(query_user_data, [(int(k), v, v) for k, v in commands_ran.items()], True),
+                Statement(query_usage, [(str(k), v, v) for k, v in usage.items()], True),
+            ))
+        except Exception:
+            # an exception would stop the loop for good, keep the counts for the next round instead
+            logging.exception("Could not write the command usage")
+            for k, v in commands_ran.items():
+                self.cache[k] = self.cache.get(k, 0) + v
+            for k, v in usage.items():
+                self.cache_usage[k] = self.cache_usage.get(k, 0) + v
+
+        self.bot.cache.expire()
+        try:
+            await self.bot.data.flush()
+        except Exception:
+            # flush keeps everything dirty, it is retried on the next round
+            logging.exception("Could not flush the currency data")
 
     @loops.before_loop
     async def before_loops(self):
@@ -2,12 +2,14 @@ import asyncio
 import collections
 import datetime
 import io
+import itertools
 import math
 import os
 import pathlib
 import traceback
 
 import discord
+import humanize
 import mystbin
 import tabulate
 import utils.json_loader
@@ -15,12 +17,28 @@ from discord.ext import commands
 from jishaku.codeblocks import codeblock_converter
 from jishaku.models import copy_context_with
 from utils.chat_formatting import box, hyperlink
+from utils.db import is_read_query, needs_autocommit
+from utils.migrations import explain, get_version
 from utils.useful import Embed, BaseMenu, pages, fuzzy
 
 @pages()
 async def show_result(self, menu, entry):
     return f"```\n{entry}```"
 
+SQL_CHUNK_ROWS = 250
+SQL_MAX_ROWS = 10_000
+SQL_MAX_BYTES = 4 * 1024 * 1024
+SQL_MAX_CELL = 200
+SQL_MAX_PAGES = 15
+
+def format_rows(rows, columns):
+    """Formats one chunk of a result as a psql table, cutting overly long cells."""
+    rows = [
+        [cell[:SQL_MAX_CELL] + "..." if isinstance(cell, str) and len(cell) > SQL_MAX_CELL else cell for cell in row]
+        for row in rows
+    ]
+    return tabulate.tabulate(rows, headers=columns, tablefmt="psql")
+
 class Developer(commands.Cog):
     """dev-only commands that make the bot dynamic."""
 
@@ -71,6 +89,8 @@ class Developer(commands.Cog):
                 data["updates"]["message"] = message
                 data["updates"]["link"] = link
                 utils.json_loader.write_json(data, "config")
+                if (help_cog := self.bot.get_cog("Help")) is not None:
+                    help_cog.invalidate()
             await ctx.send("Done!")
 
     @dev.command(name="status")
@@ -209,18 +229,60 @@ class Developer(commands.Cog):
 
     @dev.command()
     async def sql(self, ctx, *, query: str):
-        async with self.bot.db.execute(query) as cur:
-            await self.bot.db.commit()
-            if cur.description:
-                columns = [tuple[0] for tuple in cur.description]
-            else:
-                columns = "keys"
-            thing = await cur.fetchall()
-            if len(thing) == 0:
-                return await ctx.message.add_reaction(f"{self.bot.greenTick}")
-            thing = tabulate.tabulate(thing, headers=columns, tablefmt="psql")
-            byte = io.BytesIO(str(thing).encode("utf-8"))
-            return await ctx.send(file=discord.File(fp=byte, filename="table.txt"))
+        if is_read_query(query):
+            async with self.bot.db.execute(query) as cur:
+                columns = [tuple[0] for tuple in cur.description] if cur.description else "keys"
+                return await self.show_rows(ctx, columns, cur.fetchmany)
+
+        # PRAGMAs and RETURNING give rows back through the writer as well
+        columns, rows, rowcount = await self.bot.writer.fetch(
+            query, autocommit=needs_autocommit(query), limit=SQL_MAX_ROWS
+        )
+        if columns is None:
+            await ctx.message.add_reaction(f"{self.bot.greenTick}")
+            return await ctx.send(f"`{rowcount}` rows affected.")
+        rows = iter(rows)
+
+        async def fetchmany(size):
+            return list(itertools.islice(rows, size))
+
+        await self.show_rows(ctx, columns, fetchmany)
+
+    async def show_rows(self, ctx, columns, fetchmany):
+        """Pages the rows `fetchmany` hands out a chunk at a time, or sends them as a file when they don't fit."""
+        loop = asyncio.get_event_loop()
+        paginator = commands.Paginator(prefix=None, suffix=None, max_size=1900)
+        paging = True
+        output = io.StringIO()
+        total = size = 0
+        truncated = False
+        while rows := await fetchmany(min(SQL_CHUNK_ROWS, SQL_MAX_ROWS - total)):
+            table = await loop.run_in_executor(None, format_rows, rows, columns)
+            if size + len(table) + 1 > SQL_MAX_BYTES:
+                truncated = True
+                break
+            total += len(rows)
+            size += len(table) + 1
+            output.write(table + "\n")
+            lines = table.splitlines()
+            # only keep building pages while the result could still fit in a menu
+            paging = paging and size <= SQL_MAX_PAGES * 1900 and max(map(len, lines)) < 1900
+            if paging:
+                for line in lines:
+                    paginator.add_line(line)
+            if total >= SQL_MAX_ROWS:
+                truncated = bool(await fetchmany(1))
+                break
+        if total == 0:
+            return await ctx.message.add_reaction(f"{self.bot.greenTick}")
+
+        note = f"`{total:,}` rows" + (" (result cut at the row/size cap)" if truncated else "")
+        if paging and len(paginator.pages) <= SQL_MAX_PAGES:
+            await ctx.send(note)
+            menu = BaseMenu(source=show_result(paginator.pages))
+            return await menu.start(ctx)
+        byte = io.BytesIO(output.getvalue().encode("utf-8"))
+        return await ctx.send(note, file=discord.File(fp=byte, filename="table.txt"))
 
     @sql.error
     async def sql_error(self, ctx, error):
@@ -228,6 +290,177 @@ class Developer(commands.Cog):
             await ctx.message.add_reaction(f"{self.bot.redTick}")
             await ctx.send(str.capitalize(str(error.original)))
 
+    @dev.command(name="gate")
+    async def _gate(self, ctx):
+        """Shows how many messages the message gate dropped at each stage"""
+        stats = self.bot.gate.stats
+        total = stats.pop("total") or 1
+        rows = [(stage, count, f"{count / total:.1%}") for stage, count in stats.items()]
+        table = tabulate.tabulate(rows, headers=("stage", "messages", "share"), tablefmt="psql")
+        await ctx.send(box(table))
+
+    @dev.command(name="cache")
+    async def _cache(self, ctx):
+        """Shows the size, hit rate, evictions and memory of every cache"""
+        rows = []
+        for name, stats in self.bot.cache.stats().items():
+            hit_rate = stats.get("hit_rate")
+            rows.append((
+                name,
+                f"{stats['size']:,}/{stats.get('maxsize') or '∞'}",
+                stats.get("ttl") or "-",
+                stats.get("policy", "-"),
+                f"{hit_rate:.1%}" if hit_rate is not None else "-",
+                stats.get("evictions", "-"),
+                humanize.naturalsize(stats["memory"]),
+            ))
+        headers = ("cache", "size", "ttl", "policy", "hit rate", "evictions", "memory")
+        await ctx.send(box(tabulate.tabulate(rows, headers=headers, tablefmt="psql")))
+
+    @dev.command(name="flush")
+    async def _flush(self, ctx):
+        """Writes the dirty currency accounts right away"""
+        result = await self.bot.data.flush()
+        if result is None:
+            return await ctx.send("Nothing to flush.")
+        await ctx.send(
+            f"{self.bot.greenTick} Flushed `{result['rows']:,}` accounts, "
+            f"`{result['inventory_rows']:,}` inventory rows and `{result['ledger_rows']:,}` ledger rows in "
+            f"`{result['statements']}` statements ({result['duration'] * 1000:.1f} ms)"
+        )
+
+    @dev.command(name="ledger")
+    async def _ledger(self, ctx):
+        """Shows how much the economy ledger buffered and wrote"""
+        ledger = self.bot.ledger
+        cur = await self.bot.db.execute("SELECT ledger_id FROM economy_state")
+        (watermark,) = await cur.fetchone()
+        duration = ledger.last_duration
+        await ctx.send(
+            f"**Buffered**: {len(ledger):,} rows\n"
+            f"**Written**: {ledger.rows_written:,} rows in {ledger.flushes:,} inserts"
+            + (f" (last insert {duration * 1000:.1f} ms)" if duration is not None else "") + "\n"
+            f"**Watermark**: ledger id {watermark:,} is included in currency_data"
+        )
+
+    @dev.command(name="compact")
+    async def _compact(self, ctx):
+        """Removes the empty inventory rows and shows the last compactions"""
+        cog = self.bot.get_cog("Currency")
+        await cog.compact()
+        rows = [(at.strftime("%d-%b %H:%M:%S"), removed) for at, removed in cog.compactions]
+        table = tabulate.tabulate(rows, headers=("compacted at", "rows removed"), tablefmt="psql")
+        await ctx.send(box(table))
+
+    @dev.command(name="writer")
+    async def _writer(self, ctx):
+        """Shows the queue depth and commit latency of the database writer"""
+        stats = self.bot.writer.stats()
+        ms = lambda s: f"{s * 1000:.2f} ms" if s is not None else "-"
+        await ctx.send(
+            f"**Queue depth**: {stats['depth']}\n"
+            f"**Commits**: {stats['commits']:,} ({stats['jobs']:,} writes, {stats['avg_batch']:.1f} per commit)\n"
+            f"**Commit latency**: p50 {ms(stats['commit_p50'])} | p99 {ms(stats['commit_p99'])}"
+        )
+
+    @dev.command(name="explain")
+    async def _explain(self, ctx):
+        """Shows the query plan of every registered query and flags unexpected full table scans"""
+        version = await get_version(self.bot.db.connection)
+        paginator = commands.Paginator(prefix=None, suffix=None, max_size=1000)
+        flagged = 0
+        for name, plan, ok in await explain(self.bot.db.connection):
+            flagged += not ok
+            paginator.add_line(f"{'OK  ' if ok else 'SCAN'} {name}\n{plan}\n")
+        await ctx.send(f"Schema version `{version}`, `{flagged}` queries doing a full scan.")
+        menu = BaseMenu(source=show_result(paginator.pages))
+        await menu.start(ctx)
+
+    @dev.command(name="probe")
+    async def _probe(self, ctx):
+        """Shows the latency histogram of the database probe"""
+        probe = self.bot.probe
+        stats = probe.stats()
+        if not stats["samples"]:
+            return await ctx.send("The probe has not taken any sample yet.")
+        histogram = probe.histogram()
+        peak = max(histogram.values()) or 1
+        rows = [
+            (f"<= {bound} ms" if bound != float("inf") else "slower", count, "#" * round(count / peak * 30))
+            for bound, count in histogram.items()
+        ]
+        ms = lambda s: f"{s * 1000:.2f} ms"
+        table = tabulate.tabulate(rows, headers=("latency", "samples", ""), tablefmt="psql")
+        await ctx.send(
+            f"**Samples**: {stats['samples']:,} ({stats['failures']:,} failed) | "
+            f"p50 {ms(stats['p50'])} | p95 {ms(stats['p95'])} | p99 {ms(stats['p99'])}\n"
+            f"**Write queue**: {stats['writer_depth']} (peak {stats['max_writer_depth']})\n"
+            + box(table)
+        )
+
+    @dev.command(name="queries")
+    async def _queries(self, ctx, order="total"):
+        """Shows the most expensive statements, ordered by total, calls, p99, rows or wait"""
+        if order == "reset":
+            self.bot.db.recorder.reset()
+            return await ctx.send(f"{self.bot.greenTick} Query statistics reset.")
+        if order not in ("total", "calls", "p99", "rows", "wait"):
+            raise commands.BadArgument("Order by one of total, calls, p99, rows or wait.")
+        ms = lambda s: f"{s * 1000:.2f}" if s is not None else "-"
+        rows = [
+            (
+                query["query"] if len(query["query"]) <= 60 else query["query"][:57] + "...",
+                f"{query['calls']:,}", ms(query["total"]), ms(query["p50"]), ms(query["p99"]),
+                f"{query['rows']:,}", ms(query["wait"] / query["calls"]),
+            )
+            for query in self.bot.db.recorder.top(order, limit=25)
+        ]
+        if not rows:
+            return await ctx.send("No queries were recorded yet.")
+        headers = ("query", "calls", "total ms", "p50 ms", "p99 ms", "rows", "avg wait ms")
+        table = tabulate.tabulate(rows, headers=headers, tablefmt="psql")
+        paginator = commands.Paginator(prefix=None, suffix=None, max_size=1900)
+        for line in table.splitlines():
+            paginator.add_line(line)
+        menu = BaseMenu(source=show_result(paginator.pages))
+        await menu.start(ctx)
+
+    @dev.command(name="slowlog")
+    async def _slowlog(self, ctx):
+        """Shows the latest statements that went over the slow-query threshold"""
+        recorder = self.bot.db.recorder
+        if not recorder.slow:
+            return await ctx.send(f"No query took longer than {recorder.slow_threshold * 1000:.0f} ms.")
+        paginator = commands.Paginator(prefix=None, suffix=None, max_size=1000)
+        for at, query, elapsed, wait in reversed(recorder.slow):
+            paginator.add_line(
+                f"[{at.strftime('%d-%b %H:%M:%S')}] {elapsed * 1000:.1f} ms ({wait * 1000:.1f} ms waiting)\n{query}\n"
+            )
+        menu = BaseMenu(source=show_result(paginator.pages))
+        await menu.start(ctx)
+
+    @dev.command(name="backup")
+    async def _backup(self, ctx):
+        """Takes an online backup of the database and shows the latest backups"""
+        backups = self.bot.backups
+        if backups.running:
+            return await ctx.send("A backup is already running.")
+        async with ctx.typing():
+            await backups.backup()
+        ms = lambda s: f"{s * 1000:.1f}"
+        rows = [
+            (
+                os.path.basename(result.path), humanize.naturalsize(result.size), f"{result.duration:.2f}",
+                ms(result.max_step), ms(result.loop_lag), ms(result.max_commit), result.restarts,
+            )
+            for result in reversed(backups.history)
+        ]
+        headers = ("backup", "size", "seconds", "step ms", "loop lag ms", "commit ms", "restarts")
+        await ctx.send(
+            f"{self.bot.greenTick} Kept `{len(backups.backups())}` backups\n"
+            + box(tabulate.tabulate(rows, headers=headers, tablefmt="psql"))
+        )
+
     @dev.command(name="git")
     async def _git(self, ctx, *, arguments):
         text = await self.git(arguments=arguments)
@@ -248,23 +481,18 @@ class Developer(commands.Cog):
 
     @commands.command(name="close")
     async def _close(self, ctx):
-        await self.bot.logout()
-        for user in self.bot.cache["users"]:
-            query = "UPDATE currency_data SET wallet = ?, bank = ?, max_bank = ?, boost = ?, exp = ?, lvl = ? WHERE user_id = ?"
-            await self.bot.db.execute(
-                query,
-                (
-                    self.bot.cache["users"][user]["wallet"],
-                    self.bot.cache["users"][user]["bank"],
-                    self.bot.cache["users"][user]["max_bank"],
-                    round(self.bot.cache["users"][user]["boost"], 2),
-                    self.bot.cache["users"][user]["exp"],
-                    self.bot.cache["users"][user]["lvl"],
-                    user,
-                ),
-            )
-
-        await self.bot.db.commit()
+        # everything is written before logging out: once logout returns, Client.run stops the loop
+        try:
+            await self.bot.data.flush()
+            if (tags := self.bot.get_cog("Tags")) is not None:
+                await tags.index.flush()
+            await self.bot.ledger.close()
+            self.bot.backups.close()
+            self.bot.probe.close()
+            await self.bot.writer.close()
+            await self.bot.db.close()
+        finally:
+            await self.bot.logout()
 
 
 def setup(bot):
@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from utils.useful import Embed, Cooldown
-import contextlib
 from itertools import chain
 from utils.json_loader import read_json
 from datetime import datetime
@@ -9,6 +8,34 @@ from datetime import datetime
 class GrootHelp(commands.HelpCommand):
 
 
+    async def can_run(self, command):
+        """`command.can_run` for the author, remembered per command, user and guild for a short while.
+        Only passed and failed checks are remembered; a command on cooldown still counts as runnable."""
+        ctx = self.context
+        key = (command.qualified_name, ctx.author.id, getattr(ctx.guild, "id", None))
+        checks = self.cog.checks
+        if (result := checks.get(key)) is None:
+            try:
+                result = await command.can_run(ctx)
+            except commands.CommandOnCooldown:
+                return True
+            except commands.CheckFailure:
+                result = False
+            except commands.CommandError:
+                return False
+            checks[key] = result
+        return result
+
+    async def filter_commands(self, commands, *, sort=False, key=None):
+        """Same as the default one, but the checks go through `can_run`."""
+        filtered = [
+            command for command in commands
+            if (self.show_hidden or not command.hidden) and await self.can_run(command)
+        ]
+        if sort:
+            filtered.sort(key=key or (lambda command: command.name))
+        return filtered
+
     @staticmethod
     def get_doc(command):
         _help = command.help or "This command has no description"
@@ -53,11 +80,34 @@ class GrootHelp(commands.HelpCommand):
 
         return em
         
+    def get_news(self):
+        config = read_json("config")
+        news = config['updates']
+        date = datetime.strptime(news['date'], "%Y-%m-%d %H:%M:%S.%f")
+        date, link, message = date.strftime("%d %B, %Y"), news['link'], news['message']
+
+        return (
+            f"📰 Latest News - {date}",
+            "[Jump to the full message\n"
+            "Can't open? Click the support button to join the support server]"
+            f"({link})\n\n"
+            f"{message}"
+        )
+
+    def get_categories(self, owner):
+        categories = self.context.bot.categories.copy()
+        if not owner:
+            categories.pop("Unlisted", None)
+        return categories
+
+    def get_category_commands(self, category):
+        cogs = [self.context.bot.get_cog(cog) for cog in self.context.bot.categories[category]]
+        return list(chain(*(cog.get_commands() for cog in cogs if cog is not None)))
+
     async def handle_help(self, command):
-        with contextlib.suppress(commands.CommandError):
-            if not await command.can_run(self.context):
-                raise commands.CommandError
-            return await self.context.send(embed=self.get_command_help(command))
+        if await self.can_run(command):
+            embed = self.cog.cached(("command", command.qualified_name), self.get_command_help, command)
+            return await self.context.send(embed=embed)
         raise commands.BadArgument("You do not have the permissions to view this command's help.")
 
     async def send_bot_help(self, mapping):
@@ -82,9 +132,8 @@ class GrootHelp(commands.HelpCommand):
             icon_url=ctx.author.avatar_url
         )
         # Categories
-        categories = bot.categories.copy()
-        if ctx.author != bot.owner:
-            categories.pop("Unlisted")
+        owner = ctx.author == bot.owner
+        categories = self.cog.cached(("categories", owner), self.get_categories, owner)
         newline = '\n'
         em.add_field(
             name="Categories",
@@ -92,18 +141,8 @@ class GrootHelp(commands.HelpCommand):
         )
 
         # News
-        config = read_json("config")
-        news = config['updates']
-        date = datetime.strptime(news['date'], "%Y-%m-%d %H:%M:%S.%f")
-        date, link, message = date.strftime("%d %B, %Y"), news['link'], news['message']
-
-        em.add_field(
-            name=f"📰 Latest News - {date}",
-            value="[Jump to the full message\n"
-            "Can't open? Click the support button to join the support server]"
-            f"({link})\n\n"
-            f"{message}"
-        )
+        name, value = self.cog.cached(("news",), self.get_news)
+        em.add_field(name=name, value=value)
         channel = self.get_destination()
         await channel.send(embed=em)
 
@@ -124,17 +163,13 @@ class GrootHelp(commands.HelpCommand):
     
     async def send_category_help(self, category):
         to_find = category.lower().title()
-        categories = self.context.bot.categories.copy()
-
-        if self.context.author != self.context.bot.owner:
-            categories.pop("Unlisted")
+        owner = self.context.author == self.context.bot.owner
+        categories = self.cog.cached(("categories", owner), self.get_categories, owner)
 
         if to_find not in categories: return None
         
-        category = categories[to_find]
-        cogs = [self.context.bot.get_cog(cog) for cog in category]
-        commands = [cog.get_commands() for cog in cogs]
-        commands = [f"`{command.name}`" for command in await self.filter_commands(chain(*commands))]
+        commands = self.cog.cached(("category", to_find), self.get_category_commands, to_find)
+        commands = [f"`{command.name}`" for command in await self.filter_commands(commands)]
         
         em = Embed(description=' '.join(commands))
         em.set_author(name=f"{to_find} [{len(commands)}]")
@@ -145,7 +180,8 @@ class GrootHelp(commands.HelpCommand):
     # Error handlers
     async def command_not_found(self, command):
         if command.lower() == "all":
-            commands = [f"`{command.name}`" for command in await self.filter_commands(self.context.bot.commands)]
+            commands = self.cog.cached(("all",), list, self.context.bot.commands)
+            commands = [f"`{command.name}`" for command in await self.filter_commands(commands)]
             em = Embed(description=" ".join(commands))
             em.set_author(name=f"All commands [{len(commands)}]")
             channel = self.get_destination()
@@ -167,11 +203,33 @@ class GrootHelp(commands.HelpCommand):
             
 
 class Help(commands.Cog):
+    """Holds what the help command can reuse between invocations.
+
+    `static` has the parts of the help embeds that only depend on the command
+    tree (and the news), it is dropped whenever `bot.commands_version` moves.
+    `checks` remembers `can_run` per command, user and guild for a short TTL.
+    """
+
     def __init__(self, bot):
         self.bot = bot
+        self.static = {}
+        self.version = bot.commands_version
+        self.checks = bot.cache["help_checks"]
         help_command = GrootHelp()
         help_command.cog = self
         bot.help_command = help_command
+
+    def invalidate(self):
+        self.static.clear()
+        self.checks.clear()
+        self.version = self.bot.commands_version
+
+    def cached(self, key, build, *args):
+        if self.version != self.bot.commands_version:
+            self.invalidate()
+        if (value := self.static.get(key)) is None:
+            value = self.static[key] = build(*args)
+        return value
     
 def setup(bot):
     bot.add_cog(Help(bot), category="Information")
\ No newline at end of file
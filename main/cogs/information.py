@@ -26,20 +26,12 @@ class Information(commands.Cog):
         msg = await ctx.send("<a:typing:826939777290076230> pinging...")
         end = time.perf_counter()
         typing_ping = (end - start) * 1000
-        query = "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
-
-        async with self.bot.db.execute(query) as cur:
-            row = await cur.fetchall()
-        a = [i[0] for i in row]
-        start = time.perf_counter()
-        for name in a:
-            query = f"SELECT * FROM {name}"
-            async with self.bot.db.execute(query):
-                end = time.perf_counter()
-
-        sql_ping = (end - start) * 1000
+        stats = self.bot.probe.stats()
+        ms = lambda s: f"{s * 1000:.1f} ms" if s is not None else "-"
         await msg.edit(
-            content=f"**Typing**: {round(typing_ping, 1)} ms\n**Websocket**: {round(self.bot.latency*1000)} ms\n**Database**: {round(sql_ping, 1)} ms"
+            content=f"**Typing**: {round(typing_ping, 1)} ms\n**Websocket**: {round(self.bot.latency*1000)} ms\n"
+            f"**Database**: {ms(stats['p50'])} (p95 {ms(stats['p95'])}, p99 {ms(stats['p99'])})\n"
+            f"**Write queue**: {stats['writer_depth']}"
         )
 
     @commands.command(name="vote", brief="The links where you can vote for the bot.")
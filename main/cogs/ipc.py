@@ -21,6 +21,18 @@ class Ipc(commands.Cog):
             "uptime": humanize.precisedelta(datetime.datetime.utcnow() - self.bot.launch_time, format='%.0f')
         }
         return stats
+
+    @ipc.server.route()
+    async def get_query_stats(self, data):
+        recorder = self.bot.db.recorder
+        return {
+            "queries": recorder.top(getattr(data, "order", "total"), limit=getattr(data, "limit", 25)),
+            "slow": [
+                {"at": at.isoformat(), "query": query, "elapsed": elapsed, "wait": wait}
+                for at, query, elapsed, wait in recorder.slow
+            ],
+            "slow_threshold": recorder.slow_threshold,
+        }
     
 
     # Events
@@ -310,7 +310,7 @@ class Moderation(commands.Cog, description="Moderation commands"):
 
         try:
             await member.edit(nick=nickname)
-            await self.bot.db.execute(
+            await self.bot.writer.execute(
                 "INSERT INTO frozen_names VALUES (?,?,?)",
                 (ctx.guild.id, member.id, nickname),
             )
@@ -333,7 +333,7 @@ class Moderation(commands.Cog, description="Moderation commands"):
         finder = await cur.fetchall()
 
         if finder:
-            cur = await self.bot.db.execute(
+            await self.bot.writer.execute(
                 "DELETE FROM frozen_names WHERE guild_id = ? AND user_id = ?",
                 (ctx.guild.id, member.id),
             )
@@ -349,7 +349,7 @@ class Moderation(commands.Cog, description="Moderation commands"):
                 try:
                     await after.edit(nick=frozen[0][2], reason="Nickname frozen.")
                 except discord.Forbidden:
-                    await self.bot.db.execute(
+                    await self.bot.writer.execute(
                         "DELETE FROM frozen_names WHERE guild_id = ? AND user_id = ?",
                         (after.guild.id, after.id),
                     )
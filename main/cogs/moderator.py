@@ -39,7 +39,7 @@ class Moderator(commands.Cog):
             else "UPDATE guild_config SET blacklisted = ? WHERE guild_id = ?"
         )
 
-        cur = await self.bot.db.execute(query, (blacklist, target.id))
+        await self.bot.writer.execute(query, (blacklist, target.id))
         if mode == "add":
             msg = f"**{target.name}** now got blacklisted! bad bad bad"
             self.bot.cache["blacklisted_users"].add(target.id)
@@ -75,7 +75,7 @@ class Moderator(commands.Cog):
             else "UPDATE guild_config SET premium = ? WHERE guild_id = ?"
         )
 
-        cur = await self.bot.db.execute(query, (premium, target.id))
+        await self.bot.writer.execute(query, (premium, target.id))
         if mode == "add":
             msg = f"<:Boosters:814930829461553152> **{target.name}** now got premium perks!"
             self.bot.cache["premium_users"].add(target.id)
@@ -92,7 +92,7 @@ class Moderator(commands.Cog):
     async def _edit_(
         self, ctx, action, user: typing.Union[discord.Member, discord.User], amount: int
     ):
-        self.bot.cache["users"][user.id][action] += amount
+        await self.bot.data.update_data(user.id, amount, mode=action)
         return await ctx.send(
             f"{self.bot.greenTick} Successfully gave {user.mention} {amount:,} `{action}`."
         )
@@ -128,8 +128,8 @@ class Moderator(commands.Cog):
                 INSERT INTO item_info
                 VALUES (?,?,?,?,?)
                 """
-        await self.bot.db.execute(query, (a[4], a[1], a[0], a[3], a[2]))
-        await self.bot.db.commit()
+        await self.bot.writer.execute(query, (a[4], a[1], a[0], a[3], a[2]))
+        await self.bot.catalog.refresh()
         cmd = self.bot.get_command("shop")
         return await ctx.invoke(cmd, item=a[0])
 
@@ -140,8 +140,8 @@ class Moderator(commands.Cog):
                 DELETE FROM item_info
                 WHERE lower(item_name) = ?
                 """
-        await self.bot.db.execute(query, (item,))
-        await self.bot.db.commit()
+        await self.bot.writer.execute(query, (item,))
+        await self.bot.catalog.refresh()
         return await ctx.send(f"{self.bot.greenTick} Deleted item `{item}` from shop.")
 
 def setup(bot):
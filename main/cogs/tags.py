@@ -1,35 +1,305 @@
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+import logging
 import re
+import shutil
 import sqlite3
+import tempfile
 import time
 
-from discord.ext import commands
+import discord
+from discord.ext import commands, tasks
+from utils.db import Statement
+
+from utils.migrations import TAG_SEARCH
+from utils.tagindex import TagIndex
+from utils.useful import BaseMenu, Embed, pages
+
+SEARCH_RESULTS = 100
+TOP_TAGS = 100
+
+TRANSFER_FIELDS = ("name", "content", "author", "uses", "created")
+TRANSFER_FORMATS = ("jsonl", "csv")
+EXPORT_CHUNK_ROWS = 500
+IMPORT_MAX_BYTES = 25 * 1024 * 1024
+IMPORT_MAX_ROWS = 20000
+IMPORT_BATCH_ROWS = 500
+IMPORT_PROGRESS_ROWS = 1000
+IMPORT_PROGRESS_SECONDS = 3
+
+
+@pages(per_page=5)
+async def search_pages(self, menu, entries):
+    return Embed(title=menu.title, description="\n\n".join(entries))
+
+
+@pages(per_page=10)
+async def top_pages(self, menu, entries):
+    return Embed(title=menu.title, description="\n".join(entries))
+
+
+def dump_tags(rows, fmt):
+    """Encodes a chunk of exported tags as JSON lines or CSV rows."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+    return "".join(
+        json.dumps(dict(zip(TRANSFER_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+def load_tags(fp, fmt):
+    """Yields the tags of an export one at a time as dicts, None for a line that isn't one."""
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        yield from csv.DictReader(text)
+        return
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def number(value, cast, default, maximum=2 ** 63 - 1):
+    """`value` as a non-negative number no bigger than `maximum`, `default` when it isn't one."""
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        return default
+    return value if 0 <= value <= maximum else default
+
+
+def transfer_format(filename):
+    name = filename.lower()
+    name = name[:-3] if name.endswith(".gz") else name
+    return "csv" if name.endswith(".csv") else "jsonl" if name.endswith((".jsonl", ".json")) else None
+
+
+def fts_query(text):
+    """Turns user input into an FTS5 query matching every word, so operators and quotes are searched for literally."""
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in text.split())
 
 
 class Tags(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.index = TagIndex(
+            bot.db, bot.writer, bot.cache["tag_contents"], bot.cache["tag_indexes"]
+        )
+        self.flush_uses.start()
+
+    def cog_unload(self):
+        self.flush_uses.cancel()
+        self.bot.loop.create_task(self.index.flush())
+
+    @tasks.loop(minutes=1)
+    async def flush_uses(self):
+        try:
+            await self.index.flush()
+        except Exception:
+            # the counts were put back, the next run writes them
+            logging.exception("Could not write the tag uses")
 
     @commands.group(invoke_without_command=True, case_insensitive=True)
     async def tag(self, ctx, tag):
         tag = tag.lower()
 
-        query = "SELECT tag_content FROM tags WHERE tag_guild_id = ? AND tag_name = ?"
-        cur = await self.bot.db.execute(query, (ctx.guild.id, tag))
-        row = await cur.fetchone()
+        content = await self.index.get(ctx.guild.id, tag)
 
-        if not row:
-            cur = await self.bot.db.execute(
-                "SELECT tag_name FROM tags WHERE tag_guild_id = ? AND tag_name LIKE ?",
-                (ctx.guild.id, f"%{tag}%"),
-            )
-            row = await cur.fetchall()
-            if not row:
+        if content is None:
+            names = await self.index.suggest(ctx.guild.id, tag)
+            if not names:
                 return await ctx.send("Tag not found.")
             else:
-                names = "\n".join(r[0] for r in row)
+                names = "\n".join(names)
                 return await ctx.send(f"Tag not found. Did you mean...\n{names}")
 
-        await ctx.send(row[0])
+        self.index.use(ctx.guild.id, tag)
+        await ctx.send(content)
+
+    @tag.command()
+    async def top(self, ctx):
+        """Shows the most used tags of this server."""
+        tags = await self.index.guild(ctx.guild.id)
+        top = [(name, uses) for name, uses in tags.top(TOP_TAGS) if uses]
+        if not top:
+            return await ctx.send(f"{self.bot.redTick} No tag of this server has been used yet.")
+
+        entries = [f"**{i}.** {name} — `{uses:,}` uses" for i, (name, uses) in enumerate(top, 1)]
+        menu = BaseMenu(source=top_pages(entries))
+        menu.title = f"Most used tags of {ctx.guild.name}"
+        await menu.start(ctx)
+
+    @tag.command()
+    async def stats(self, ctx, tag=None):
+        """Shows how much the tags of this server are used, or the stats of one tag."""
+        tags = await self.index.guild(ctx.guild.id)
+        if tag is None:
+            top = "\n".join(f"{name} — `{uses:,}` uses" for name, uses in tags.top(3) if uses)
+            em = Embed(title=f"Tags of {ctx.guild.name}")
+            em.add_field(name="Tags", value=f"{len(tags):,}")
+            em.add_field(name="Uses", value=f"{sum(tags.uses.values()):,}")
+            em.add_field(name="Most used", value=top or "None yet", inline=False)
+            return await ctx.send(embed=em)
+
+        tag = tag.lower()
+        if tag not in tags:
+            return await ctx.send(f"{self.bot.redTick} No tag is found called `{tag}`.")
+        query = "SELECT tag_author, tag_creation_date FROM tags WHERE tag_guild_id = ? AND tag_name = ?"
+        cur = await self.bot.db.execute(query, (ctx.guild.id, tag))
+        author, created = await cur.fetchone() or (None, None)
+
+        em = Embed(title=tag)
+        em.add_field(name="Uses", value=f"{tags.uses[tag]:,}")
+        em.add_field(name="Rank", value=f"#{tags.rank(tag):,} of {len(tags):,}")
+        em.add_field(name="Owner", value=f"<@{author}>" if author else "Unknown")
+        if created:
+            em.timestamp = datetime.datetime.utcfromtimestamp(created)
+            em.set_footer(text="Created")
+        await ctx.send(embed=em)
+
+    @tag.command()
+    async def search(self, ctx, *, query):
+        """Searches this server's tags by name and content, best matches first."""
+        match = fts_query(query)
+        if not match:
+            raise commands.BadArgument(f"{self.bot.redTick} Give me something to search for!")
+        cur = await self.bot.db.execute(TAG_SEARCH, (match, ctx.guild.id, SEARCH_RESULTS))
+        rows = await cur.fetchall()
+        if not rows:
+            return await ctx.send(f"{self.bot.redTick} No tags matched your search.")
+
+        entries = [f"**{name}**\n{snippet}" for name, snippet in rows]
+        menu = BaseMenu(source=search_pages(entries))
+        menu.title = f"Tags matching {query}"[:256]
+        await menu.start(ctx)
+
+    @tag.command(name="export")
+    async def _export(self, ctx, fmt="jsonl"):
+        """Exports every tag of this server as a `jsonl` or `csv` file.
+        The file can be brought back with the import command.
+        """
+        fmt = fmt.lower()
+        if fmt not in TRANSFER_FORMATS:
+            raise commands.BadArgument(f"{self.bot.redTick} Tags can be exported as `jsonl` or `csv`.")
+
+        query = "SELECT tag_name, tag_content, tag_author, tag_uses, tag_creation_date FROM tags WHERE tag_guild_id = ? ORDER BY tag_name"
+        filename = f"tags-{ctx.guild.id}.{fmt}"
+        total = 0
+        with tempfile.TemporaryFile() as fp:
+            if fmt == "csv":
+                fp.write(dump_tags((TRANSFER_FIELDS,), fmt))
+            async with self.bot.db.execute(query, (ctx.guild.id,)) as cur:
+                while rows := await cur.fetchmany(EXPORT_CHUNK_ROWS):
+                    fp.write(dump_tags(rows, fmt))
+                    total += len(rows)
+            if total == 0:
+                return await ctx.send(f"{self.bot.redTick} This server has no tags to export.")
+
+            if fp.tell() > ctx.guild.filesize_limit:
+                fp.seek(0)
+                compressed = tempfile.TemporaryFile()
+                with gzip.GzipFile(filename=filename, mode="wb", fileobj=compressed) as gz:
+                    shutil.copyfileobj(fp, gz)
+                fp, filename = compressed, f"{filename}.gz"
+            fp.seek(0)
+            with fp:
+                await ctx.send(
+                    f"{self.bot.greenTick} Exported `{total:,}` tags.",
+                    # discord.File only takes io objects, on Windows TemporaryFile wraps one
+                    file=discord.File(getattr(fp, "file", fp), filename=filename),
+                )
+
+    @tag.command(name="import")
+    @commands.has_permissions(manage_guild=True)
+    @commands.max_concurrency(1, commands.BucketType.guild, wait=False)
+    async def _import(self, ctx):
+        """Imports tags from an attached `jsonl` or `csv` export (optionally gzipped).
+        Every line needs a `name` and `content`, `author`, `uses` and `created` are kept when present.
+        Tags that already exist on this server are skipped.
+        """
+        if not ctx.message.attachments:
+            raise commands.BadArgument(f"{self.bot.redTick} Attach the file to import to your message.")
+        attachment = ctx.message.attachments[0]
+        if (fmt := transfer_format(attachment.filename)) is None:
+            raise commands.BadArgument(f"{self.bot.redTick} Only `.jsonl` and `.csv` files can be imported.")
+        if attachment.size > IMPORT_MAX_BYTES:
+            raise commands.BadArgument(f"{self.bot.redTick} That file is too big to import.")
+
+        existing = await self.index.guild(ctx.guild.id)
+        message = await ctx.send(f"Reading `{attachment.filename}`...")
+        tags = {}
+        checked = invalid = duplicates = 0
+        edited = time.monotonic()
+        error = None
+        with tempfile.TemporaryFile() as fp:
+            async with self.bot.session() as cs:
+                async with cs.get(attachment.url) as r:
+                    async for chunk in r.content.iter_chunked(64 * 1024):
+                        fp.write(chunk)
+            fp.seek(0)
+            source = gzip.GzipFile(fileobj=fp) if attachment.filename.lower().endswith(".gz") else fp
+            try:
+                for row in load_tags(source, fmt):
+                    checked += 1
+                    try:
+                        if not row or not row.get("name") or not row.get("content"):
+                            raise commands.BadArgument("Every tag needs a `name` and `content`.")
+                        name, content = await self.convert_tag(ctx, str(row["name"]), str(row["content"]))
+                    except commands.BadArgument as e:
+                        invalid += 1
+                        error = error or f"line {checked}: {e}"
+                    else:
+                        if name in tags or name in existing:
+                            duplicates += 1
+                        elif len(tags) >= IMPORT_MAX_ROWS:
+                            raise commands.BadArgument(
+                                f"{self.bot.redTick} Only `{IMPORT_MAX_ROWS:,}` tags can be imported at once."
+                            )
+                        else:
+                            tags[name] = (
+                                ctx.guild.id,
+                                name,
+                                content,
+                                number(row.get("author"), int, ctx.author.id),
+                                number(row.get("uses"), int, 0),
+                                number(row.get("created"), float, time.time(), maximum=time.time()),
+                            )
+                    if checked % IMPORT_PROGRESS_ROWS == 0:
+                        if time.monotonic() - edited > IMPORT_PROGRESS_SECONDS:
+                            edited = time.monotonic()
+                            await message.edit(content=f"Checked `{checked:,}` lines, `{len(tags):,}` tags to import...")
+                        await asyncio.sleep(0)
+            except (csv.Error, UnicodeDecodeError, OSError, EOFError):
+                raise commands.BadArgument(f"{self.bot.redTick} That file could not be read as {fmt}.")
+
+        if not tags:
+            return await message.edit(content=f"{self.bot.redTick} There was nothing to import." + (f"\nThe first invalid one was {error}" if error else ""))
+
+        await message.edit(content=f"Importing `{len(tags):,}` tags...")
+        query = "INSERT OR IGNORE INTO tags (tag_guild_id,tag_name,tag_content,tag_author,tag_uses,tag_creation_date) VALUES (?, ?, ?, ?, ?, ?)"
+        rows = list(tags.values())
+        rowcounts = await self.bot.writer.transaction(
+            Statement(query, rows[i:i + IMPORT_BATCH_ROWS], True)
+            for i in range(0, len(rows), IMPORT_BATCH_ROWS)
+        )
+        self.index.add_many(ctx.guild.id, {name: row[4] for name, row in tags.items()})
+        imported = sum(rowcounts)
+        summary = f"{self.bot.greenTick} Imported `{imported:,}` tags."
+        if skipped := duplicates + len(tags) - imported:
+            summary += f"\n`{skipped:,}` tags were duplicates or already existed and were skipped."
+        if invalid:
+            summary += f"\n`{invalid:,}` lines were invalid, the first one was {error}"
+        await message.edit(content=summary[:2000])
 
     async def convert_tag(self, ctx, tag, content):
 
@@ -66,13 +336,13 @@ class Tags(commands.Cog):
 
         query = "INSERT INTO tags (tag_guild_id,tag_name,tag_content,tag_author,tag_uses,tag_creation_date) VALUES (?, ?, ?, ?, ?, ?)"
         try:
-            cur = await self.bot.db.execute(
+            await self.bot.writer.execute(
                 query, (ctx.guild.id, tag, content, ctx.author.id, 0, time.time())
             )
         except sqlite3.IntegrityError:
             await ctx.send(f"{self.bot.redTick} That tag already exists!")
         else:
-            await self.bot.db.commit()
+            self.index.add(ctx.guild.id, tag, content)
             return await ctx.send(
                 f"{self.bot.greenTick} Done! Created tag **{tag}**. `{await self.bot.get_prefix(ctx.message)}tag {tag}`"
             )
@@ -98,8 +368,8 @@ class Tags(commands.Cog):
             )
 
         query = "DELETE FROM tags WHERE tag_name = ? AND tag_guild_id = ?"
-        cur = await self.bot.db.execute(query, (tag, ctx.guild.id))
-        await self.bot.db.commit()
+        await self.bot.writer.execute(query, (tag, ctx.guild.id))
+        self.index.remove(ctx.guild.id, tag)
         return await ctx.send(f"{self.bot.greenTick} Deleted tag `{tag}`.")
 
 
@@ -0,0 +1,180 @@
+import asyncio
+import datetime
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from collections import deque, namedtuple
+
+BackupResult = namedtuple(
+    "BackupResult", "path size duration pages restarts max_step loop_lag max_commit at"
+)
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class BackupScheduler:
+    """Takes online backups of the database with SQLite's backup API.
+
+    Pages are copied `pages_per_step` at a time on a worker thread, sleeping
+    `step_sleep` seconds between steps, so neither the event loop nor the writer
+    connection waits on the copy. The backup restarts whenever another
+    connection writes between two steps; after `max_restarts` of those the rest
+    is copied in one step, which in WAL mode only holds a read snapshot.
+
+    Backups are named `main-<timestamp>.sqlite3[.gz]`, only the newest `keep` are
+    kept. Every backup reports its duration, the longest single step, the worst
+    event loop lag and the slowest writer commit seen while it ran.
+    """
+
+    PREFIX = "main-"
+
+    def __init__(
+        self, path, writer, *, directory, interval=6 * 3600, keep=8, compress=True,
+        pages_per_step=256, step_sleep=0.005, max_restarts=20,
+    ):
+        self.path = path
+        self.writer = writer
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.compress = compress
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self.history = deque(maxlen=10)
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    @property
+    def running(self):
+        return self._lock.locked()
+
+    def start(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+        return self._task
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.backup()
+            except Exception:
+                logging.exception("Scheduled backup failed")
+
+    def backups(self):
+        """Paths of the existing backups, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(
+            (name for name in os.listdir(self.directory)
+             if name.startswith(self.PREFIX) and not name.endswith(".tmp")),
+            reverse=True,
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def rotate(self):
+        """Deletes every backup but the newest `keep`, returns the deleted paths."""
+        stale = self.backups()[self.keep:]
+        for path in stale:
+            os.remove(path)
+        return stale
+
+    def _copy(self, target, stats):
+        last = time.perf_counter()
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal last, last_remaining
+            now = time.perf_counter()
+            # the sleep between steps happens before this callback, leave it out
+            stats["max_step"] = max(stats["max_step"], now - last - self.step_sleep)
+            last = now
+            stats["pages"] = total
+            if last_remaining is not None and remaining > last_remaining:
+                stats["restarts"] += 1
+                if stats["restarts"] > self.max_restarts:
+                    raise _TooManyRestarts
+            last_remaining = remaining
+
+        source = sqlite3.connect(self.path)
+        destination = sqlite3.connect(target)
+        try:
+            try:
+                source.backup(
+                    destination, pages=self.pages_per_step, progress=progress, sleep=self.step_sleep
+                )
+            except _TooManyRestarts:
+                last = time.perf_counter()
+                source.backup(destination)
+                stats["max_step"] = max(stats["max_step"], time.perf_counter() - last)
+        finally:
+            destination.close()
+            source.close()
+
+    @staticmethod
+    def _compress(source, target):
+        with open(source, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.remove(source)
+
+    async def _watch_loop(self, stats, interval=0.05):
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            stats["loop_lag"] = max(stats["loop_lag"], loop.time() - start - interval)
+
+    async def backup(self):
+        """Takes a backup now, rotates the old ones and returns a `BackupResult`."""
+        async with self._lock:
+            loop = asyncio.get_event_loop()
+            os.makedirs(self.directory, exist_ok=True)
+            now = datetime.datetime.utcnow()
+            name = f"{self.PREFIX}{now:%Y%m%d-%H%M%S-%f}.sqlite3"
+            path = os.path.join(self.directory, name)
+            copy, compressed = f"{path}.tmp", f"{path}.gz.tmp"
+            stats = {"max_step": 0.0, "loop_lag": 0.0, "pages": 0, "restarts": 0}
+            commits = self.writer.commits
+
+            watcher = loop.create_task(self._watch_loop(stats))
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(None, self._copy, copy, stats)
+                if self.compress:
+                    await loop.run_in_executor(None, self._compress, copy, compressed)
+                    copy, path = compressed, f"{path}.gz"
+                os.replace(copy, path)
+            except BaseException:
+                for leftover in (copy, compressed):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+                raise
+            finally:
+                watcher.cancel()
+            duration = time.perf_counter() - start
+
+            # the commits the writer made while the backup ran
+            latencies = list(self.writer.commit_latencies)
+            during = latencies[len(latencies) - min(self.writer.commits - commits, len(latencies)):]
+            result = BackupResult(
+                path, os.path.getsize(path), duration, stats["pages"], stats["restarts"],
+                stats["max_step"], stats["loop_lag"], max(during, default=0.0), now,
+            )
+            self.history.append(result)
+            self.rotate()
+            logging.warning(
+                f"Backed up the database to {path} in {duration:.2f}s "
+                f"(longest step {result.max_step * 1000:.1f} ms, loop lag {result.loop_lag * 1000:.1f} ms, "
+                f"slowest commit {result.max_commit * 1000:.1f} ms)"
+            )
+            return result
@@ -1,9 +1,208 @@
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
 from datetime import datetime
+from itertools import islice
+
+
+def approximate_size(obj):
+    """Rough memory footprint in bytes: the object itself plus one level of its contents."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, Mapping):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (set, frozenset, list, tuple)):
+        size += sum(sys.getsizeof(i) for i in obj)
+    return size
+
+
+class CacheNamespace(MutableMapping):
+    """A bounded mapping with an idle TTL, LRU or LFU eviction and hit/miss counters.
+
+    `ttl` is measured from the last time a key was read or written.
+    `on_evict(key, value)` is called whenever a key is dropped because of the size
+    cap or its TTL, but not when it is deleted explicitly.
+
+    Iterating (`keys`, `values`, `items`, `dict(ns)`...) reads the stored values
+    as they are: it neither counts hits nor refreshes TTLs or use order. LFU
+    keeps the keys in buckets per use count (oldest first), so evicting is O(1).
+    """
+
+    POLICIES = ("lru", "lfu")
+
+    def __init__(self, name, *, maxsize=None, ttl=None, policy="lru", on_evict=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}, expected one of {self.POLICIES}")
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.policy = policy
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._expires = {}
+        self._uses = {}  # LFU: key -> use count
+        self._buckets = {}  # LFU: use count -> keys with that count, oldest first
+        self._min_uses = 0
+
+    def __repr__(self):
+        return f"<CacheNamespace name={self.name!r} size={len(self)} maxsize={self.maxsize} ttl={self.ttl} policy={self.policy}>"
+
+    def _touch(self, key):
+        if self.ttl is not None:
+            self._expires[key] = time.monotonic() + self.ttl
+        if self.policy == "lru":
+            self._data.move_to_end(key)
+        else:
+            self._count_use(key)
+
+    def _count_use(self, key):
+        uses = self._uses.get(key, 0)
+        if uses:
+            bucket = self._buckets[uses]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[uses]
+                if self._min_uses == uses:
+                    self._min_uses = uses + 1
+        else:
+            self._min_uses = 1
+        self._uses[key] = uses + 1
+        self._buckets.setdefault(uses + 1, OrderedDict())[key] = None
+
+    def _forget(self, key):
+        self._expires.pop(key, None)
+        if (uses := self._uses.pop(key, None)) is not None:
+            bucket = self._buckets[uses]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[uses]
+
+    def _is_expired(self, key, now=None):
+        expires = self._expires.get(key)
+        return expires is not None and expires <= (now or time.monotonic())
+
+    def _evict(self, key):
+        value = self._data.pop(key)
+        self._forget(key)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _evict_one(self, keep):
+        if self.policy == "lru":
+            key = next(iter(self._data))
+        else:
+            # the key that was just written always has the lowest count, so it is skipped
+            if self._min_uses not in self._buckets:
+                self._min_uses = min(self._buckets)
+            key = next((k for k in islice(self._buckets[self._min_uses], 2) if k != keep), None)
+            if key is None:
+                others = [uses for uses in self._buckets if uses != self._min_uses]
+                key = next(iter(self._buckets[min(others)])) if others else keep
+        self._evict(key)
+
+    def __getitem__(self, key):
+        if key not in self._data or self._is_expired(key):
+            self.misses += 1
+            if key in self._data:
+                self._evict(key)
+            raise KeyError(key)
+        self.hits += 1
+        self._touch(key)
+        return self._data[key]
+
+    def peek(self, key, default=None):
+        """Returns the value of a key without counting a hit or refreshing its TTL."""
+        return self._data.get(key, default)
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._touch(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._evict_one(key)
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._forget(key)
+
+    def __contains__(self, key):
+        if key not in self._data:
+            return False
+        if self._is_expired(key):
+            self._evict(key)
+            return False
+        return True
+
+    def __iter__(self):
+        # a snapshot, so reading the keys while iterating can't reorder `_data` under us
+        return iter(list(self._data))
+
+    def keys(self):
+        return self._data.keys()
+
+    def values(self):
+        return self._data.values()
+
+    def items(self):
+        return self._data.items()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self._expires.clear()
+        self._uses.clear()
+        self._buckets.clear()
+        self._min_uses = 0
+
+    def expire(self):
+        """Drops every key whose TTL ran out and returns how many were dropped."""
+        if self.ttl is None:
+            return 0
+        now = time.monotonic()
+        expired = [key for key in self._data if self._is_expired(key, now)]
+        for key in expired:
+            self._evict(key)
+        return len(expired)
+
+    def memory_usage(self):
+        return sys.getsizeof(self._data) + sum(
+            sys.getsizeof(k) + approximate_size(v) for k, v in self._data.items()
+        )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "memory": self.memory_usage(),
+        }
+
 
 class CacheManager(dict):
+    """Holds every cache of the bot by name.
 
-    def __init__(self):
-        pass
+    Names configured through `namespace` are bounded `CacheNamespace`s; assigning a
+    plain mapping to one of them refills the namespace instead of replacing it,
+    so `bot.cache["users"] = {}` keeps the limits. Anything else (the blacklist
+    sets, for example) is stored as is.
+    """
+
+    def __init__(self, config=None):
+        super().__init__()
+        for name, options in (config or {}).items():
+            self.namespace(name, **options)
 
     @property
     def length(self):
@@ -15,12 +214,41 @@ class CacheManager(dict):
         template = f"[{now}] {message}\n"
         return template
 
+    def namespace(self, name, **options):
+        """Creates (or reconfigures) a bounded namespace called `name`."""
+        namespace = CacheNamespace(name, **options)
+        if isinstance(existing := super().get(name), Mapping):
+            namespace.update(existing.items())
+        super().__setitem__(name, namespace)
+        return namespace
 
     def __setitem__(self, key, value):
+        namespace = super().get(key)
+        if isinstance(namespace, CacheNamespace) and isinstance(value, Mapping):
+            if value is not namespace:
+                namespace.clear()
+                namespace.update(value)
+            return
         return super().__setitem__(key, value)
-    
+
     def __getitem__(self, key):
         return super().__getitem__(key)
 
     def get(self, key, default=None):
-        return super().get(key, default)
\ No newline at end of file
+        return super().get(key, default)
+
+    def expire(self):
+        """Sweeps the expired keys out of every namespace."""
+        return sum(
+            value.expire() for value in self.values() if isinstance(value, CacheNamespace)
+        )
+
+    def stats(self):
+        """Returns the statistics of every cache, keyed by name."""
+        stats = {}
+        for name, value in self.items():
+            if isinstance(value, CacheNamespace):
+                stats[name] = value.stats()
+            else:
+                stats[name] = {"size": len(value), "memory": approximate_size(value)}
+        return stats
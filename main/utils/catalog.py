@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+Item = namedtuple("Item", "id price name description")
+
+
+def normalize(name):
+    return " ".join(name.lower().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ItemCatalog:
+    """In-memory copy of `item_info`.
+
+    Keeps an exact index on the normalized item names and a trigram index that
+    narrows down partial-name lookups, so the currency commands never have to run
+    a `LIKE '%x%'` query. Call `refresh` whenever `item_info` changes.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.items = ()
+        self._names = ()
+        self._by_id = {}
+        self._by_name = {}
+        self._trigrams = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    async def refresh(self):
+        """Reloads every item from the database and rebuilds the indexes."""
+        query = "SELECT item_id, item_price, item_name, item_description FROM item_info"
+        cur = await self.bot.db.execute(query)
+        items = tuple(Item(*row) for row in await cur.fetchall())
+
+        names = tuple(normalize(item.name) for item in items)
+        index = {}
+        for position, name in enumerate(names):
+            for trigram in trigrams(name):
+                index.setdefault(trigram, []).append(position)
+
+        self.items, self._names, self._trigrams = items, names, index
+        self._by_id = {item.id: item for item in items}
+        self._by_name = {}
+        for name, item in zip(names, items):
+            self._by_name.setdefault(name, item)
+        return len(items)
+
+    def get(self, name):
+        """Returns the item called exactly `name` (case insensitive) or None."""
+        return self._by_name.get(normalize(name))
+
+    def get_by_id(self, item_id):
+        return self._by_id.get(item_id)
+
+    def search(self, query):
+        """Returns every item whose name contains `query`, in catalog order."""
+        query = normalize(query)
+        if len(query) < 3:
+            positions = range(len(self.items))
+        else:
+            postings = sorted(
+                (self._trigrams.get(trigram, ()) for trigram in trigrams(query)), key=len
+            )
+            positions = set(postings[0]).intersection(*postings[1:])
+            positions = sorted(positions)
+        return [self.items[i] for i in positions if query in self._names[i]]
+
+    def find(self, query):
+        """Resolves a (partial) item name: an exact match wins, otherwise the first item containing `query`."""
+        if (item := self.get(query)) is not None:
+            return item
+        found = self.search(query)
+        return found[0] if found else None
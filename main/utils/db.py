@@ -0,0 +1,410 @@
+import asyncio
+import datetime
+import itertools
+import logging
+import re
+import time
+from collections import deque, namedtuple
+
+import aiosqlite
+from aiosqlite.context import contextmanager
+
+Statement = namedtuple("Statement", "sql params many", defaults=((), False))
+
+
+READ_KEYWORDS = ("select", "explain", "values")
+# statements that can't run inside the writer's transaction
+AUTOCOMMIT_KEYWORDS = ("begin", "commit", "end", "rollback", "savepoint", "release", "vacuum")
+# the keywords a WITH clause can be followed by
+CTE_BODIES = {"select", "values", "insert", "replace", "update", "delete"}
+
+# quoted strings and identifiers, and comments, none of which can hold the keyword that matters
+_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`(?:[^`]|``)*`|\[[^\]]*\]|--[^\n]*|/\*.*?(?:\*/|$)", re.S)
+_TOKENS = re.compile(r"[()]|[a-z_][a-z0-9_$]*")
+
+
+def is_read_query(sql):
+    """Whether a statement only reads. Anything unsure (PRAGMA, for example) counts as a write.
+
+    A WITH statement is a read only if the statement after its common table
+    expressions is a SELECT, so WITH ... DELETE still goes to the writer.
+    """
+    depth = 0
+    tokens = _TOKENS.finditer(_QUOTED.sub(" ", sql.lower()))
+    for token in tokens:
+        first = token.group()
+        if first != "(":
+            break
+        depth += 1
+    else:
+        return False
+    if first != "with":
+        return first in READ_KEYWORDS
+    base = depth
+    for token in tokens:
+        word = token.group()
+        if word == "(":
+            depth += 1
+        elif word == ")":
+            depth -= 1
+        elif depth == base and word in CTE_BODIES:
+            return word in READ_KEYWORDS
+    return False
+
+
+def needs_autocommit(sql):
+    """Whether a statement controls transactions itself (or is VACUUM), so it has to run outside the writer's savepoints."""
+    return sql.lstrip(" \t\r\n;").lower().startswith(AUTOCOMMIT_KEYWORDS)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an iterable of numbers, None if it is empty."""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_query(sql):
+    """Collapses a statement to its shape: literals become `?`, `IN (?, ?, ...)` becomes `(...)`, whitespace is squashed."""
+    sql = _LITERALS.sub("?", sql)
+    sql = _IN_LISTS.sub("(...)", sql)
+    return " ".join(sql.split())
+
+
+class QueryStats:
+    __slots__ = ("query", "calls", "total", "wait", "rows", "latencies")
+
+    def __init__(self, query, samples):
+        self.query = query
+        self.calls = 0
+        self.total = 0.0
+        self.wait = 0.0
+        self.rows = 0
+        self.latencies = deque(maxlen=samples)
+
+    def to_dict(self):
+        return {
+            "query": self.query,
+            "calls": self.calls,
+            "total": self.total,
+            "wait": self.wait,
+            "rows": self.rows,
+            "p50": percentile(self.latencies, 50),
+            "p95": percentile(self.latencies, 95),
+            "p99": percentile(self.latencies, 99),
+        }
+
+
+class InstrumentedCursor(aiosqlite.Cursor):
+    """A cursor that adds the rows it fetches to the statistics of its statement."""
+
+    def __init__(self, conn, cursor, stats):
+        super().__init__(conn, cursor)
+        self._stats = stats
+
+    def _count(self, rows):
+        self._stats.rows += len(rows)
+        return rows
+
+    async def fetchone(self):
+        row = await super().fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    async def fetchmany(self, size=None):
+        return self._count(await super().fetchmany(size))
+
+    async def fetchall(self):
+        return self._count(await super().fetchall())
+
+
+class QueryRecorder:
+    """Times every statement sent to an aiosqlite connection, grouped by normalized statement.
+
+    The time a statement spends queued behind other work on the connection's
+    thread is recorded separately as `wait`. Statements slower than
+    `slow_threshold` seconds go to the slow-query log. Telling the two apart
+    needs aiosqlite's private `_execute`, which is why requirements.txt pins it.
+    """
+
+    def __init__(self, *, slow_threshold=0.1, samples=256, slow_log_size=50):
+        self.slow_threshold = slow_threshold
+        self.samples = samples
+        self.queries = {}
+        self.slow = deque(maxlen=slow_log_size)
+
+    def record(self, sql, elapsed, wait):
+        query = normalize_query(sql)
+        if (stats := self.queries.get(query)) is None:
+            stats = self.queries[query] = QueryStats(query, self.samples)
+        stats.calls += 1
+        stats.total += elapsed
+        stats.wait += wait
+        stats.latencies.append(elapsed)
+        if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+            self.slow.append((datetime.datetime.utcnow(), query, elapsed, wait))
+            logging.warning(f"Slow query ({elapsed * 1000:.1f} ms, {wait * 1000:.1f} ms waiting): {query}")
+        return stats
+
+    async def execute(self, conn, sql, parameters=None, *, many=False):
+        """Runs a statement on `conn` the way `Connection.execute` does, but timed."""
+        if parameters is None:
+            parameters = []
+        method = conn._conn.executemany if many else conn._conn.execute
+        submitted = started = time.perf_counter()
+
+        def run():
+            nonlocal started
+            started = time.perf_counter()
+            return method(sql, parameters)
+
+        try:
+            cursor = await conn._execute(run)
+        finally:
+            stats = self.record(sql, time.perf_counter() - submitted, started - submitted)
+        return InstrumentedCursor(conn, cursor, stats)
+
+    def top(self, key="total", limit=10):
+        """The `limit` most expensive statements, by any column of `QueryStats.to_dict`."""
+        stats = [query.to_dict() for query in self.queries.values()]
+        stats.sort(key=lambda query: query[key] or 0, reverse=True)
+        return stats[:limit]
+
+    def reset(self):
+        self.queries.clear()
+        self.slow.clear()
+
+
+class DatabaseWriter:
+    """Serialises every write to the database and commits them in groups.
+
+    Writes are queued as jobs (one or more statements that must succeed together).
+    The worker takes up to `batch_size` jobs, waiting at most `max_delay` seconds
+    for more to arrive, runs each job inside its own savepoint and commits the whole
+    group once. A caller awaiting a write only resumes after that commit, so the
+    write is durable by then. `fetch` also returns the rows a statement produced
+    (PRAGMA, RETURNING) and can run a statement outside of any transaction.
+    """
+
+    def __init__(self, db, *, batch_size=64, max_delay=0.005, recorder=None):
+        self.db = db
+        self.recorder = recorder
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.commits = 0
+        self.jobs = 0
+        self.commit_latencies = deque(maxlen=512)
+        self.batch_sizes = deque(maxlen=512)
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    @property
+    def depth(self):
+        """Amount of jobs waiting to be written."""
+        return self._queue.qsize()
+
+    def start(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+        return self._task
+
+    async def close(self):
+        """Waits for the queued writes to be committed and stops the worker."""
+        await self._queue.join()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def transaction(self, statements):
+        """Writes `statements` atomically, returns the rowcount of each statement."""
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait((tuple(statements), future, None, None))
+        return await future
+
+    async def fetch(self, sql, params=(), *, autocommit=False, limit=None):
+        """Writes a single statement and returns `(columns, rows, rowcount)`, `columns` and
+        `rows` are None when it returns no rows (`rowcount` is only reliable then). With `limit`
+        at most `limit + 1` rows are read, so a caller can tell the result was cut. With `autocommit` it runs between two
+        group commits instead of inside one, which BEGIN, COMMIT or VACUUM need."""
+        future = asyncio.get_event_loop().create_future()
+        mode = "autocommit" if autocommit else "fetch"
+        self._queue.put_nowait(((Statement(sql, params),), future, mode, limit))
+        ((columns, rows, rowcount),) = await future
+        return columns, rows, rowcount
+
+    async def execute(self, sql, params=()):
+        """Writes a single statement and returns its rowcount."""
+        (rowcount,) = await self.transaction((Statement(sql, params),))
+        return rowcount
+
+    async def executemany(self, sql, rows):
+        (rowcount,) = await self.transaction((Statement(sql, rows, True),))
+        return rowcount
+
+    def _take(self, batch):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            self._take(batch)
+            if len(batch) < self.batch_size and self.max_delay:
+                await asyncio.sleep(self.max_delay)
+                self._take(batch)
+            try:
+                await self._write(batch)
+            except Exception as e:
+                logging.exception("Writer batch failed")
+                for _, future, *_ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _run_job(self, statements, fetch=False, limit=None):
+        rowcounts = []
+        for statement in statements:
+            if self.recorder is not None:
+                cur = await self.recorder.execute(
+                    self.db, statement.sql, statement.params, many=statement.many
+                )
+            elif statement.many:
+                cur = await self.db.executemany(statement.sql, statement.params)
+            else:
+                cur = await self.db.execute(statement.sql, statement.params)
+            if not fetch:
+                rowcounts.append(cur.rowcount)
+            elif cur.description:
+                columns = [column[0] for column in cur.description]
+                rows = await cur.fetchall() if limit is None else await cur.fetchmany(limit + 1)
+                # a DML statement made all of its changes on the first step, the rest are just its rows
+                await cur.close()
+                rowcounts.append((columns, rows, cur.rowcount))
+            else:
+                rowcounts.append((None, None, cur.rowcount))
+        return rowcounts
+
+    async def _write(self, batch):
+        jobs = []
+        for job in batch:
+            if job[2] == "autocommit":
+                await self._commit(jobs)
+                jobs = []
+                await self._autocommit(*job)
+            else:
+                jobs.append(job)
+        await self._commit(jobs)
+
+    async def _autocommit(self, statements, future, mode, limit):
+        try:
+            result = await self._run_job(statements, fetch=True, limit=limit)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    async def _commit(self, batch):
+        if not batch:
+            return
+        results = []
+        if not self.db.in_transaction:
+            await self.db.execute("BEGIN")
+        for statements, future, mode, limit in batch:
+            await self.db.execute("SAVEPOINT job")
+            try:
+                rowcounts = await self._run_job(statements, fetch=mode == "fetch", limit=limit)
+            except Exception as e:
+                await self.db.execute("ROLLBACK TO job")
+                results.append((future, None, e))
+            else:
+                results.append((future, rowcounts, None))
+            await self.db.execute("RELEASE job")
+
+        start = time.perf_counter()
+        try:
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        self.commit_latencies.append(time.perf_counter() - start)
+        self.batch_sizes.append(len(batch))
+        self.commits += 1
+        self.jobs += len(batch)
+
+        for future, rowcounts, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(rowcounts)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "commits": self.commits,
+            "jobs": self.jobs,
+            "avg_batch": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0,
+            "commit_p50": percentile(self.commit_latencies, 50),
+            "commit_p99": percentile(self.commit_latencies, 99),
+        }
+
+
+class Database:
+    """What the bot uses as `bot.db`.
+
+    Writes (and anything that is not clearly a read) go to a single WAL-mode
+    connection, plain reads are spread round-robin over a pool of read-only
+    connections so they don't queue behind writes on the writer's thread.
+    Every statement is timed by `recorder`. Everything else (`commit`,
+    `rollback`, ...) is forwarded to the writer connection.
+    """
+
+    def __init__(self, connection, readers=(), recorder=None):
+        self.connection = connection
+        self.readers = list(readers)
+        self.recorder = recorder or QueryRecorder()
+        self._next_reader = itertools.cycle(self.readers).__next__ if self.readers else None
+
+    @classmethod
+    async def connect(cls, path, *, readers=4, recorder=None):
+        connection = await aiosqlite.connect(path)
+        await connection.execute("PRAGMA journal_mode=WAL")
+        pool = [
+            await aiosqlite.connect(f"file:{path}?mode=ro", uri=True)
+            for _ in range(readers)
+        ]
+        return cls(connection, pool, recorder)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def route(self, sql):
+        """Returns the connection a statement should run on."""
+        if self._next_reader is not None and is_read_query(sql):
+            return self._next_reader()
+        return self.connection
+
+    @contextmanager
+    async def execute(self, sql, parameters=None):
+        return await self.recorder.execute(self.route(sql), sql, parameters)
+
+    @contextmanager
+    async def executemany(self, sql, parameters):
+        return await self.recorder.execute(self.connection, sql, parameters, many=True)
+
+    async def close(self):
+        for reader in self.readers:
+            await reader.close()
+        await self.connection.close()
@@ -0,0 +1,68 @@
+from collections import Counter
+
+from utils.ledger import current_command
+
+
+class MessageGate:
+    """Staged filter in front of the command handler.
+
+    Every message runs through the cheapest checks first (bot authors, prefix,
+    blacklist) and only builds a context once it is very likely a command.
+    `rejected` counts how many messages were dropped at each stage.
+    """
+
+    STAGES = ("bot", "no_prefix", "blacklisted", "not_found", "disabled")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.rejected = Counter({stage: 0 for stage in self.STAGES})
+        self.passed = 0
+
+    @property
+    def stats(self):
+        total = self.passed + sum(self.rejected.values())
+        return {"total": total, "passed": self.passed, **self.rejected}
+
+    def reject(self, stage):
+        self.rejected[stage] += 1
+
+    def is_blacklisted(self, message):
+        blacklist = self.bot.cache["blacklisted_users"]
+        return (
+            message.author.id in blacklist
+            or getattr(message.guild, "id", None) in blacklist
+        )
+
+    def is_disabled(self, ctx):
+        disabled = self.bot.cache["disabled_commands"].get(ctx.command.name)
+        if not disabled:
+            return False
+        return (
+            ctx.channel.id in disabled
+            or getattr(ctx.guild, "id", None) in disabled
+        )
+
+    async def process(self, message):
+        """Runs the message through every stage and invokes the command if it passes all of them."""
+        bot = self.bot
+        if message.author.bot:
+            return self.reject("bot")
+
+        snowflake_id = message.guild.id if message.guild else message.author.id
+        await bot.load_prefix(snowflake_id)
+        if bot.prefixes.match(snowflake_id, message.content) is None:
+            return self.reject("no_prefix")
+
+        is_owner = message.author.id == bot.owner_id
+        if not is_owner and self.is_blacklisted(message):
+            return self.reject("blacklisted")
+
+        ctx = await bot.get_context(message)
+        if ctx.command is None:
+            self.reject("not_found")
+        elif not is_owner and self.is_disabled(ctx):
+            return self.reject("disabled")
+        else:
+            self.passed += 1
+            current_command.set(ctx.command.qualified_name)
+        await bot.invoke(ctx)
@@ -0,0 +1,232 @@
+from bisect import bisect_left, insort
+from itertools import islice
+
+from utils.cache import CacheNamespace
+
+
+class SortedKeys:
+    """A sorted list of unique keys with O(log n) rank lookups.
+
+    Keys are kept in buckets of at most `2 * load` keys, `_maxes` holds the last
+    key of every bucket and a Fenwick tree over the bucket sizes turns a
+    bucket number into the amount of keys before it. Adding or removing a key
+    only touches one bucket and the tree; the tree is rebuilt when a bucket is
+    split or dropped.
+    """
+
+    def __init__(self, keys=(), *, load=512):
+        self.load = load
+        self._lists = []
+        self._maxes = []
+        self._tree = []
+        self._len = 0
+        self._load(keys)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._lists:
+            yield from bucket
+
+    def _load(self, keys):
+        keys = sorted(keys)
+        self._lists = [keys[i:i + self.load] for i in range(0, len(keys), self.load)]
+        self._maxes = [bucket[-1] for bucket in self._lists]
+        self._len = len(keys)
+        self._rebuild()
+
+    def _rebuild(self):
+        tree = [0] * (len(self._lists) + 1)
+        for i, bucket in enumerate(self._lists, 1):
+            tree[i] += len(bucket)
+            if (parent := i + (i & -i)) < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _grow(self, bucket, delta):
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _before(self, bucket):
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return self._rebuild()
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._lists[i], key)
+        self._len += 1
+        if len(self._lists[i]) > 2 * self.load:
+            bucket = self._lists[i]
+            self._lists[i:i + 1] = [bucket[:self.load], bucket[self.load:]]
+            self._maxes[i:i + 1] = [bucket[self.load - 1], bucket[-1]]
+            self._rebuild()
+        else:
+            self._grow(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        bucket = self._lists[i] if i < len(self._lists) else ()
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            raise KeyError(key)
+        del bucket[j]
+        self._len -= 1
+        if not bucket:
+            del self._lists[i], self._maxes[i]
+            self._rebuild()
+        else:
+            self._maxes[i] = bucket[-1]
+            self._grow(i, -1)
+
+    def index(self, key):
+        """Position of `key` (which has to be in the list)."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            raise KeyError(key)
+        j = bisect_left(self._lists[i], key)
+        if j == len(self._lists[i]) or self._lists[i][j] != key:
+            raise KeyError(key)
+        return self._before(i) + j
+
+    def slice(self, start, stop):
+        """Keys from position `start` to `stop`, walking only the buckets it needs."""
+        lo, hi = 0, len(self._lists)
+        while lo < hi:  # first bucket that ends after `start`
+            mid = (lo + hi) // 2
+            if self._before(mid + 1) <= start:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(self._lists):
+            return []
+        offset = start - self._before(lo)
+        keys = (key for bucket in self._lists[lo:] for key in bucket)
+        return list(islice(keys, offset, offset + max(stop - start, 0)))
+
+
+class Leaderboard:
+    """Rankings of the currency accounts, kept up to date as balances change.
+
+    Every board sorts `(-score..., user_id)` keys in a `SortedKeys`, so the
+    rank of any user and every top page are O(log n). `update` is called with
+    the account whenever it changes. Guild boards are built from the global
+    keys of the guild's members on first use and then updated the same way;
+    they live in a small LRU and expire so member changes get picked up.
+    `boards_of` maps every user to the guilds whose cached board holds them, so
+    an update only touches the boards the user is on. A user seen for the first
+    time is added to the cached boards of the guilds `guilds_of(user_id)` returns.
+    """
+
+    BOARDS = {
+        "networth": lambda account: (account["wallet"] + account["bank"],),
+        "level": lambda account: (account["lvl"], account["exp"]),
+        "prestige": lambda account: (account["prestige"], account["lvl"], account["exp"]),
+    }
+
+    def __init__(self, *, guild_boards=100, guild_ttl=600, guilds_of=None):
+        self.boards = {name: SortedKeys() for name in self.BOARDS}
+        self.keys = {name: {} for name in self.BOARDS}
+        self.guilds = CacheNamespace(
+            "leaderboards", maxsize=guild_boards, ttl=guild_ttl, on_evict=self._drop_guild
+        )
+        self.boards_of = {}
+        self.guilds_of = guilds_of
+        self.loaded = False
+
+    @staticmethod
+    def make_key(score, user_id):
+        return tuple(-value for value in score) + (user_id,)
+
+    @staticmethod
+    def score_of(key):
+        return tuple(-value for value in key[:-1])
+
+    def load(self, accounts):
+        """Builds every board at once from `(user_id, account)` pairs."""
+        for name, score in self.BOARDS.items():
+            keys = {user_id: self.make_key(score(account), user_id) for user_id, account in accounts}
+            self.keys[name] = keys
+            self.boards[name] = SortedKeys(keys.values())
+        self.guilds.clear()
+        self.boards_of = {}
+        self.loaded = True
+
+    def _drop_guild(self, guild_id, boards):
+        for user_id in boards["members"]:
+            if (guilds := self.boards_of.get(user_id)) is not None:
+                guilds.discard(guild_id)
+                if not guilds:
+                    del self.boards_of[user_id]
+
+    def _join(self, user_id):
+        """Adds a user that has no key yet to the members of the cached boards of their guilds."""
+        for guild_id in self.guilds_of(user_id):
+            if (boards := self.guilds.peek(guild_id)) is not None:
+                boards["members"].add(user_id)
+                self.boards_of.setdefault(user_id, set()).add(guild_id)
+
+    def update(self, user_id, account):
+        # every board has a key for the same users
+        if self.guilds_of is not None and user_id not in self.keys["networth"]:
+            self._join(user_id)
+        guilds = [self.guilds.peek(guild_id) for guild_id in self.boards_of.get(user_id, ())]
+        for name, score in self.BOARDS.items():
+            key = self.make_key(score(account), user_id)
+            old = self.keys[name].get(user_id)
+            if old == key:
+                continue
+            self.keys[name][user_id] = key
+            for board in [self.boards[name]] + [guild[name] for guild in guilds if guild is not None]:
+                if old is not None:
+                    board.remove(old)
+                board.add(key)
+
+    def guild_board(self, guild_id, member_ids, name):
+        if (boards := self.guilds.get(guild_id)) is None:
+            members = {user_id for user_id in member_ids if user_id in self.keys[name]}
+            boards = {"members": members}
+            for board, keys in self.keys.items():
+                boards[board] = SortedKeys(keys[user_id] for user_id in members)
+            for user_id in members:
+                self.boards_of.setdefault(user_id, set()).add(guild_id)
+            self.guilds[guild_id] = boards
+        return boards[name]
+
+    def board(self, name, guild_id=None, member_ids=()):
+        if guild_id is None:
+            return self.boards[name]
+        return self.guild_board(guild_id, member_ids, name)
+
+    def rank(self, name, user_id, *, guild_id=None, member_ids=()):
+        """1-based rank of a user, None if they are not on the board."""
+        if (key := self.keys[name].get(user_id)) is None:
+            return None
+        board = self.board(name, guild_id, member_ids)
+        try:
+            return board.index(key) + 1
+        except KeyError:
+            return None
+
+    def top(self, name, limit=10, start=0, *, guild_id=None, member_ids=()):
+        """`(rank, user_id, score)` of the users ranked from `start + 1` to `start + limit`."""
+        board = self.board(name, guild_id, member_ids)
+        return [
+            (start + i + 1, key[-1], self.score_of(key))
+            for i, key in enumerate(board.slice(start, start + limit))
+        ]
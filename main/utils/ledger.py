@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import contextvars
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from utils.db import Statement
+
+# qualified name of the command being run, set by the message gate before invoking it
+current_command = contextvars.ContextVar("current_command", default=None)
+
+CURRENCY_FIELDS = ("wallet", "bank", "max_bank", "boost", "exp", "lvl", "prestige")
+
+
+class Ledger:
+    """Append-only record of every change to a currency account.
+
+    `record` only appends to an in-memory buffer. The buffer is written to
+    `economy_ledger` with one executemany every `interval` seconds, as soon as
+    it holds `max_rows` rows, or as part of the next `currencyData.flush`, which
+    also moves the `economy_state.ledger_id` watermark: `currency_data` includes
+    every ledger row up to it, so `replay` can rebuild the accounts.
+    """
+
+    INSERT = (
+        "INSERT INTO economy_ledger (user_id, field, delta, reason, command, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)"
+    )
+    WATERMARK = "UPDATE economy_state SET ledger_id = (SELECT COALESCE(MAX(id), 0) FROM economy_ledger)"
+
+    def __init__(self, bot, *, max_rows=500, interval=2):
+        self.bot = bot
+        self.max_rows = max_rows
+        self.interval = interval
+        self.rows_written = 0
+        self.flushes = 0
+        self.last_duration = None
+        self._buffer = []
+        self._task = None
+        self._pending = None
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def record(self, user_id, field, delta, reason=None):
+        if not delta:
+            return
+        self._buffer.append((user_id, field, delta, reason, current_command.get(), time.time()))
+        if len(self._buffer) >= self.max_rows and (self._pending is None or self._pending.done()):
+            self._pending = asyncio.ensure_future(self.flush())
+
+    def drain(self):
+        """Takes every buffered row out of the buffer."""
+        rows, self._buffer = self._buffer, []
+        return rows
+
+    def restore(self, rows):
+        """Puts rows that could not be written back in front of the buffer."""
+        self._buffer[:0] = rows
+
+    def statement(self, rows):
+        return Statement(self.INSERT, rows, True)
+
+    async def flush(self):
+        """Appends the buffered rows to the ledger, returns how many were written."""
+        rows = self.drain()
+        if not rows:
+            return 0
+        start = time.perf_counter()
+        try:
+            await self.bot.writer.transaction((self.statement(rows),))
+        except Exception:
+            self.restore(rows)
+            raise
+        self.written(len(rows), time.perf_counter() - start)
+        return len(rows)
+
+    def written(self, rows, duration):
+        self.rows_written += rows
+        self.flushes += 1
+        self.last_duration = duration
+
+    def start(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+        return self._task
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Could not write the economy ledger")
+
+
+def replay(path, snapshot=None):
+    """Rebuilds `currency_data` in the database at `path` from the ledger.
+
+    The accounts to start from are taken from `snapshot` (a backup, gzipped or
+    not) or, without one, from the database itself. Every ledger row past the
+    snapshot's watermark is then applied on top. Returns `(applied rows, watermark)`.
+    """
+    conn = sqlite3.connect(path, isolation_level=None)
+    tmp = None
+    try:
+        if snapshot is not None:
+            if snapshot.endswith(".gz"):
+                fd, tmp = tempfile.mkstemp(suffix=".sqlite3")
+                with gzip.open(snapshot, "rb") as src, os.fdopen(fd, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                snapshot = tmp
+            conn.execute("ATTACH DATABASE ? AS snapshot", (snapshot,))
+        source = "snapshot" if snapshot is not None else "main"
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (watermark,) = conn.execute(f"SELECT ledger_id FROM {source}.economy_state").fetchone()
+            if snapshot is not None:
+                conn.execute("DELETE FROM currency_data")
+                conn.execute("INSERT INTO currency_data SELECT * FROM snapshot.currency_data")
+            (applied,) = conn.execute(
+                "SELECT COUNT(*) FROM economy_ledger WHERE id > ?", (watermark,)
+            ).fetchone()
+            # accounts created after the snapshot start from the defaults, like create_account
+            conn.execute(
+                "INSERT OR IGNORE INTO currency_data (user_id) "
+                "SELECT DISTINCT user_id FROM economy_ledger WHERE id > ?",
+                (watermark,),
+            )
+            for field in CURRENCY_FIELDS:
+                conn.execute(
+                    f"""
+                    UPDATE currency_data
+                    SET {field} = {field} + (
+                        SELECT SUM(delta) FROM economy_ledger
+                        WHERE user_id = currency_data.user_id AND field = ? AND id > ?
+                    )
+                    WHERE user_id IN (
+                        SELECT user_id FROM economy_ledger WHERE field = ? AND id > ?
+                    )
+                    """,
+                    (field, watermark, field, watermark),
+                )
+            conn.execute("UPDATE currency_data SET boost = ROUND(boost, 2)")
+            conn.execute(Ledger.WATERMARK)
+            (watermark,) = conn.execute("SELECT ledger_id FROM economy_state").fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return applied, watermark
+    finally:
+        conn.close()
+        if tmp is not None:
+            os.remove(tmp)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild currency_data from a snapshot and the economy ledger. Stop the bot first.")
+    parser.add_argument("database", help="path to main.sqlite3")
+    parser.add_argument("--snapshot", help="backup to start from, defaults to the database's own currency_data")
+    args = parser.parse_args()
+    applied, watermark = replay(args.database, args.snapshot)
+    print(f"Applied {applied} ledger rows, currency_data is now at ledger id {watermark}")
@@ -0,0 +1,309 @@
+import logging
+from collections import namedtuple
+
+Migration = namedtuple("Migration", "version name steps")
+
+FTS_CHUNK_ROWS = 1000
+
+
+async def index_tags(db):
+    """Adds the tags that existed before `tags_fts` to it, `FTS_CHUNK_ROWS` at a time."""
+    last = 0
+    while True:
+        cur = await db.execute(
+            "SELECT rowid, tag_name, tag_content FROM tags WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last, FTS_CHUNK_ROWS),
+        )
+        rows = await cur.fetchall()
+        if not rows:
+            return
+        await db.executemany(
+            "INSERT INTO tags_fts (rowid, tag_name, tag_content) VALUES (?, ?, ?)", rows
+        )
+        last = rows[-1][0]
+
+# indexes on the columns of a PRIMARY KEY or UNIQUE constraint of the initial schema; databases
+# from before it may have the tables without the constraint, only those need the index
+CONSTRAINT_INDEXES = (
+    ("idx_tags_guild_name", "tags", ("tag_guild_id", "tag_name")),
+    ("idx_inventory_user_item", "user_Inventory", ("user_id", "item_id")),
+    ("idx_guild_config_guild", "guild_config", ("guild_id",)),
+)
+
+
+async def has_unique(db, table, columns):
+    """Whether the primary key or a unique index of `table` covers exactly `columns`, in order."""
+    cur = await db.execute(f"PRAGMA table_info({table})")
+    # the pk column holds the 1-based position in the primary key, 0 for other columns
+    primary_key = sorted((row[5], row[1]) for row in await cur.fetchall() if row[5])
+    if tuple(name for _, name in primary_key) == columns:
+        return True
+    cur = await db.execute(f"PRAGMA index_list({table})")
+    for _, name, unique, _, partial in await cur.fetchall():
+        if unique and not partial:
+            cur = await db.execute(f"PRAGMA index_info({name})")
+            if tuple(row[2] for row in await cur.fetchall()) == columns:
+                return True
+    return False
+
+
+async def index_constraints(db):
+    for name, table, columns in CONSTRAINT_INDEXES:
+        if not await has_unique(db, table, columns):
+            await db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+async def drop_duplicate_indexes(db):
+    """Drops the indexes version 2 created even where a constraint already indexes the columns."""
+    for name, table, columns in CONSTRAINT_INDEXES:
+        if await has_unique(db, table, columns):
+            await db.execute(f"DROP INDEX IF EXISTS {name}")
+
+# Every step is either a SQL statement or a coroutine function taking the connection.
+# Migrations only ever get appended to, never edited once released.
+MIGRATIONS = (
+    Migration(1, "initial schema", (
+        """
+        CREATE TABLE IF NOT EXISTS guilds (
+            guild_id INTEGER PRIMARY KEY
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS guild_config (
+            guild_id INTEGER PRIMARY KEY,
+            prefix TEXT NOT NULL DEFAULT 'g.',
+            grole INTEGER,
+            blacklisted TEXT NOT NULL DEFAULT 'FALSE',
+            premium TEXT NOT NULL DEFAULT 'FALSE'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users_data (
+            user_id INTEGER PRIMARY KEY,
+            commands_ran INTEGER NOT NULL DEFAULT 0,
+            tips TEXT NOT NULL DEFAULT 'FALSE',
+            premium TEXT NOT NULL DEFAULT 'FALSE',
+            blacklisted TEXT NOT NULL DEFAULT 'FALSE'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS currency_data (
+            user_id INTEGER PRIMARY KEY,
+            wallet INTEGER NOT NULL DEFAULT 200,
+            bank INTEGER NOT NULL DEFAULT 200,
+            max_bank INTEGER NOT NULL DEFAULT 200,
+            boost REAL NOT NULL DEFAULT 1,
+            exp INTEGER NOT NULL DEFAULT 0,
+            lvl INTEGER NOT NULL DEFAULT 0,
+            prestige INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS item_info (
+            item_id TEXT PRIMARY KEY,
+            item_price INTEGER NOT NULL,
+            item_name TEXT NOT NULL,
+            item_details TEXT,
+            item_description TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_Inventory (
+            user_id INTEGER NOT NULL,
+            item_id TEXT NOT NULL,
+            amount INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, item_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tags (
+            tag_guild_id INTEGER NOT NULL,
+            tag_name TEXT NOT NULL,
+            tag_content TEXT NOT NULL,
+            tag_author INTEGER NOT NULL,
+            tag_uses INTEGER NOT NULL DEFAULT 0,
+            tag_creation_date REAL,
+            UNIQUE (tag_guild_id, tag_name)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS frozen_names (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            nickname TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS disabled_commands (
+            snowflake_id INTEGER NOT NULL,
+            command_name TEXT NOT NULL,
+            PRIMARY KEY (snowflake_id, command_name)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS usage (
+            command TEXT PRIMARY KEY,
+            counter INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    )),
+    Migration(2, "indexes for the cog queries", (
+        index_constraints,
+        "CREATE INDEX IF NOT EXISTS idx_frozen_guild_user ON frozen_names (guild_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_disabled_command ON disabled_commands (command_name)",
+        "CREATE INDEX IF NOT EXISTS idx_users_tips ON users_data (tips)",
+        "CREATE INDEX IF NOT EXISTS idx_users_premium ON users_data (premium)",
+        "CREATE INDEX IF NOT EXISTS idx_users_blacklisted ON users_data (blacklisted)",
+        "CREATE INDEX IF NOT EXISTS idx_guild_config_premium ON guild_config (premium)",
+        "CREATE INDEX IF NOT EXISTS idx_guild_config_blacklisted ON guild_config (blacklisted)",
+    )),
+    Migration(3, "economy ledger", (
+        """
+        CREATE TABLE IF NOT EXISTS economy_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            field TEXT NOT NULL,
+            delta REAL NOT NULL,
+            reason TEXT,
+            command TEXT,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ledger_user ON economy_ledger (user_id)",
+        """
+        CREATE TABLE IF NOT EXISTS economy_state (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            ledger_id INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO economy_state (id, ledger_id) VALUES (0, 0)",
+    )),
+    Migration(4, "full-text search over tags", (
+        # external content table: the text lives in `tags`, the triggers keep the index in sync
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tags_fts USING fts5(
+            tag_name, tag_content, content='tags', tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tags_fts_insert AFTER INSERT ON tags BEGIN
+            INSERT INTO tags_fts (rowid, tag_name, tag_content)
+            VALUES (new.rowid, new.tag_name, new.tag_content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tags_fts_delete AFTER DELETE ON tags BEGIN
+            INSERT INTO tags_fts (tags_fts, rowid, tag_name, tag_content)
+            VALUES ('delete', old.rowid, old.tag_name, old.tag_content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tags_fts_update AFTER UPDATE OF tag_name, tag_content ON tags BEGIN
+            INSERT INTO tags_fts (tags_fts, rowid, tag_name, tag_content)
+            VALUES ('delete', old.rowid, old.tag_name, old.tag_content);
+            INSERT INTO tags_fts (rowid, tag_name, tag_content)
+            VALUES (new.rowid, new.tag_name, new.tag_content);
+        END
+        """,
+        index_tags,
+    )),
+    Migration(5, "several prefixes per guild", (
+        # a guild without rows uses the default prefix, guild_config.prefix keeps the first one
+        """
+        CREATE TABLE IF NOT EXISTS guild_prefixes (
+            guild_id INTEGER NOT NULL,
+            prefix TEXT NOT NULL COLLATE NOCASE,
+            UNIQUE (guild_id, prefix)
+        )
+        """,
+        "INSERT OR IGNORE INTO guild_prefixes (guild_id, prefix) SELECT guild_id, prefix FROM guild_config WHERE prefix != 'g.'",
+    )),
+    Migration(6, "drop indexes that duplicate constraints", (
+        drop_duplicate_indexes,
+    )),
+)
+
+# bm25 weighs a match in the name five times as much as one in the content
+TAG_SEARCH = """
+SELECT tags.tag_name, snippet(tags_fts, 1, '**', '**', '…', 12)
+FROM tags_fts JOIN tags ON tags.rowid = tags_fts.rowid
+WHERE tags_fts MATCH ? AND tags.tag_guild_id = ?
+ORDER BY bm25(tags_fts, 5.0, 1.0)
+LIMIT ?
+"""
+
+# The queries the cogs run, checked by `explain`. Full scans listed in FULL_SCANS are expected.
+QUERIES = {
+    "prefix": "SELECT prefix FROM guild_prefixes WHERE guild_id = ? ORDER BY rowid",
+    "guild config": "SELECT * FROM guild_config WHERE guild_id=?",
+    "giveaway role": "SELECT grole FROM guild_config WHERE guild_id=?",
+    "blacklisted": 'SELECT * FROM (SELECT guild_id AS snowflake_id, blacklisted  FROM guild_config  UNION ALL SELECT user_id AS snowflake_id, blacklisted  FROM users_data) WHERE blacklisted="TRUE"',
+    "premium": 'SELECT * FROM (SELECT guild_id AS snowflake_id, premium  FROM guild_config  UNION ALL SELECT user_id AS snowflake_id, premium  FROM users_data) WHERE premium="TRUE"',
+    "tips": 'SELECT user_id FROM users_data WHERE tips = "TRUE"',
+    "commands ran": "SELECT commands_ran FROM users_data WHERE user_id = ?",
+    "disabled commands": "SELECT command_name, snowflake_id FROM disabled_commands ORDER BY command_name",
+    "disabled command": "SELECT command_name FROM disabled_commands WHERE snowflake_id = ? AND command_name = ?",
+    "currency account": "SELECT * FROM currency_data WHERE user_id = ?",
+    "currency flush": "UPDATE currency_data SET wallet = ? WHERE user_id = ?",
+    "inventory": "SELECT item_id, amount FROM user_Inventory WHERE user_id = ? AND amount > 0",
+    "inventory delete": "DELETE FROM user_Inventory WHERE user_id = ? AND item_id = ?",
+    "item catalog": "SELECT item_id, item_price, item_name, item_description FROM item_info",
+    "tag": "SELECT tag_content FROM tags WHERE tag_guild_id = ? AND tag_name = ?",
+    "tag names": "SELECT tag_name FROM tags WHERE tag_guild_id = ?",
+    "tag author": "SELECT tag_author FROM tags WHERE tag_name = ? AND tag_guild_id = ?",
+    "tag delete": "DELETE FROM tags WHERE tag_name = ? AND tag_guild_id = ?",
+    "tag info": "SELECT tag_author, tag_creation_date FROM tags WHERE tag_guild_id = ? AND tag_name = ?",
+    "tag export": "SELECT tag_name, tag_content, tag_author, tag_uses, tag_creation_date FROM tags WHERE tag_guild_id = ? ORDER BY tag_name",
+    "tag uses": "UPDATE tags SET tag_uses = tag_uses + ? WHERE tag_guild_id = ? AND tag_name = ?",
+    "tag search": TAG_SEARCH,
+    "frozen names": "SELECT * FROM frozen_names WHERE guild_id = ? AND user_id = ?",
+    "frozen delete": "DELETE FROM frozen_names WHERE guild_id = ? AND user_id = ?",
+}
+FULL_SCANS = {"item catalog"}
+
+
+async def get_version(db):
+    cur = await db.execute("PRAGMA user_version")
+    (version,) = await cur.fetchone()
+    return version
+
+
+async def migrate(db):
+    """Runs every migration newer than the database's `user_version`, each in its own transaction.
+    Returns the version the database is at afterwards."""
+    version = await get_version(db)
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        logging.warning(f"Migrating database to version {migration.version}: {migration.name}")
+        await db.execute("BEGIN")
+        try:
+            for step in migration.steps:
+                if callable(step):
+                    await step(db)
+                else:
+                    await db.execute(step)
+            # PRAGMA does not take parameters, the version is always one of our own ints
+            await db.execute(f"PRAGMA user_version = {int(migration.version)}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        version = migration.version
+    return version
+
+
+async def explain(db, queries=None):
+    """Runs EXPLAIN QUERY PLAN on every query and returns `(name, plan, ok)` tuples.
+    `ok` is False when a query scans a whole table without an index and is not an expected full scan."""
+    results = []
+    for name, query in (queries or QUERIES).items():
+        params = (None,) * query.count("?")
+        cur = await db.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        plan = [row[-1] for row in await cur.fetchall()]
+        scans = [
+            detail for detail in plan
+            if detail.startswith("SCAN") and "INDEX" not in detail
+        ]
+        results.append((name, "\n".join(plan), not scans or name in FULL_SCANS))
+    return results
@@ -0,0 +1,62 @@
+import re
+
+
+class PrefixMatcher:
+    """Keeps a compiled, case-insensitive prefix pattern per guild/DM snowflake.
+
+    The patterns are only rebuilt through `set`, so resolving the prefix of a
+    message never has to compile a regex. Once `set_mention` is called, a
+    mention of the bot (and the whitespace after it) is a prefix everywhere.
+    """
+
+    def __init__(self, storage=None, default="g."):
+        self.default = default
+        self._entries = storage if storage is not None else {}
+        self._mentions = {}
+        self._mention_prefix = None
+
+    def __contains__(self, snowflake_id):
+        return snowflake_id in self._entries
+
+    @staticmethod
+    def compile(prefixes):
+        """Builds one alternation out of every prefix, longest first so `g..` beats `g.`"""
+        ordered = sorted(dict.fromkeys(prefixes), key=len, reverse=True)
+        return re.compile("|".join(map(re.escape, ordered)), flags=re.I)
+
+    def set(self, snowflake_id, prefixes):
+        """Sets (and compiles) the prefixes for a snowflake. Accepts a string or an iterable of strings."""
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        prefixes = tuple(prefixes) or (self.default,)
+        self._entries[snowflake_id] = (prefixes, self.compile(prefixes))
+        return prefixes
+
+    def get(self, snowflake_id):
+        """Returns the tuple of prefixes for a snowflake, raises KeyError if it was never loaded."""
+        return self._entries[snowflake_id][0]
+
+    def discard(self, snowflake_id):
+        self._entries.pop(snowflake_id, None)
+
+    def set_mention(self, user_id):
+        """Makes `<@user_id>` and `<@!user_id>` prefixes for every snowflake."""
+        self._mention_prefix = re.compile(rf"<@!?{int(user_id)}>\s*")
+
+    def match(self, snowflake_id, content):
+        """Returns the prefix as written in `content` or None, raises KeyError if the snowflake was never loaded."""
+        pattern = self._entries[snowflake_id][1]
+        if self._mention_prefix is not None and (match := self._mention_prefix.match(content)) is not None:
+            return match.group()
+        match = pattern.match(content)
+        if match is not None:
+            return match.group()
+        return None
+
+    def is_mention(self, content, user_id):
+        """Checks if `content` is nothing but a mention of `user_id`."""
+        try:
+            pattern = self._mentions[user_id]
+        except KeyError:
+            pattern = self._mentions[user_id] = re.compile(f"<@!?{user_id}>")
+        return pattern.fullmatch(content) is not None
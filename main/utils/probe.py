@@ -0,0 +1,81 @@
+import asyncio
+import bisect
+import logging
+import time
+from collections import deque
+
+from utils.db import percentile
+
+# upper bounds of the histogram buckets, in milliseconds
+BUCKETS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, float("inf"))
+
+
+class DatabaseProbe:
+    """Measures database health in the background.
+
+    Every `interval` seconds it times a `SELECT 1` on the connection a normal read
+    would use and notes the writer's queue depth. The last `samples` results
+    form a rolling window, so commands like `ping` can report without touching
+    the database themselves.
+    """
+
+    def __init__(self, db, writer, *, interval=5, samples=720, timeout=5):
+        self.db = db
+        self.writer = writer
+        self.interval = interval
+        self.timeout = timeout
+        self.latencies = deque(maxlen=samples)
+        self.depths = deque(maxlen=samples)
+        self.failures = 0
+        self.last_sample = None
+        self._task = None
+
+    def start(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+        return self._task
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await self.sample()
+            await asyncio.sleep(self.interval)
+
+    async def sample(self):
+        """Takes one measurement, returns the latency in seconds or None if the probe failed."""
+        conn = self.db.route("SELECT 1")
+        start = time.perf_counter()
+        try:
+            cur = await asyncio.wait_for(conn.execute("SELECT 1"), self.timeout)
+            await cur.fetchone()
+        except Exception as e:
+            self.failures += 1
+            logging.warning(f"Database probe failed: {e!r}")
+            return None
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        self.depths.append(self.writer.depth)
+        self.last_sample = time.monotonic()
+        return latency
+
+    def histogram(self):
+        """Amount of samples per bucket of `BUCKETS`."""
+        counts = [0] * len(BUCKETS)
+        for latency in self.latencies:
+            counts[bisect.bisect_left(BUCKETS, latency * 1000)] += 1
+        return dict(zip(BUCKETS, counts))
+
+    def stats(self):
+        return {
+            "samples": len(self.latencies),
+            "failures": self.failures,
+            "p50": percentile(self.latencies, 50),
+            "p95": percentile(self.latencies, 95),
+            "p99": percentile(self.latencies, 99),
+            "writer_depth": self.writer.depth,
+            "max_writer_depth": max(self.depths, default=0),
+            "age": time.monotonic() - self.last_sample if self.last_sample is not None else None,
+        }
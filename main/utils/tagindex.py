@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+from collections import Counter
+from difflib import SequenceMatcher
+
+from utils.db import Statement
+
+
+def trigrams(text):
+    """Trigrams of `text` padded like pg_trgm, so one and two letter names still have some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class GuildTags:
+    """The tag names of one guild, how often each was used and an inverted trigram index over them."""
+
+    __slots__ = ("names", "postings", "uses")
+
+    def __init__(self, tags=()):
+        self.names = {}  # name -> its amount of trigrams
+        self.postings = {}
+        self.uses = {}
+        for name, uses in tags:
+            self.add(name, uses)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def add(self, name, uses=0):
+        if name in self.names:
+            return
+        grams = trigrams(name)
+        self.names[name] = len(grams)
+        self.uses[name] = uses
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(name)
+
+    def remove(self, name):
+        if name not in self.names:
+            return
+        del self.names[name], self.uses[name]
+        for gram in trigrams(name):
+            if (names := self.postings.get(gram)) is not None:
+                names.discard(name)
+                if not names:
+                    del self.postings[gram]
+
+    def suggest(self, query, limit=5, threshold=0.3):
+        """The `limit` names closest to `query`, best first.
+
+        Candidates share at least one trigram with the query and are scored by
+        trigram similarity; names containing the query (what the old LIKE
+        lookup returned) always qualify and ties are broken by edit similarity.
+        """
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scored = []
+        for name, common in shared.items():
+            score = common / (len(grams) + self.names[name] - common)
+            if query in name:
+                score += 1
+            elif score < threshold:
+                continue
+            scored.append((score, name))
+        best = heapq.nlargest(limit, scored)
+        best.sort(key=lambda item: (-item[0], -SequenceMatcher(None, query, item[1]).ratio(), item[1]))
+        return [name for _, name in best]
+
+    def use(self, name, count=1):
+        if name in self.uses:
+            self.uses[name] += count
+
+    def top(self, limit=10):
+        """`(name, uses)` of the `limit` most used tags, most used first."""
+        return heapq.nsmallest(limit, self.uses.items(), key=lambda item: (-item[1], item[0]))
+
+    def rank(self, name):
+        """1-based position of a tag in `top`."""
+        uses = self.uses[name]
+        return 1 + sum(other > uses or (other == uses and n < name) for n, other in self.uses.items())
+
+
+class TagIndex:
+    """Lookups of the tags of every guild, answered from memory where possible.
+
+    Tag contents are cached in `contents`, keyed by `(guild_id, name)`. The
+    first miss in a guild loads all of its tag names into a `GuildTags` held in
+    `guilds`; after that, unknown names are answered without a query and
+    "did you mean" comes from its trigram index. `add` and `remove` keep both
+    up to date as tags are created and deleted, including while a guild loads.
+
+    `use` counts a use in memory; `flush` adds the counts to `tag_uses` in one
+    batch. A guild is loaded while no flush is running and gets the counts that
+    were not flushed yet, so its `uses` are always exact.
+    """
+
+    NAMES = "SELECT tag_name, tag_uses FROM tags WHERE tag_guild_id = ?"
+    CONTENT = "SELECT tag_content FROM tags WHERE tag_guild_id = ? AND tag_name = ?"
+    USES = "UPDATE tags SET tag_uses = tag_uses + ? WHERE tag_guild_id = ? AND tag_name = ?"
+
+    def __init__(self, db, writer, contents, guilds):
+        self.db = db
+        self.writer = writer
+        self.contents = contents
+        self.guilds = guilds
+        self.pending = {}  # guild_id -> Counter of uses that are not in the database yet
+        self.flushed_uses = 0
+        self._loading = {}
+        self._flush_lock = asyncio.Lock()
+
+    async def guild(self, guild_id):
+        if (tags := self.guilds.get(guild_id)) is not None:
+            return tags
+        if (loading := self._loading.get(guild_id)) is not None:
+            return await asyncio.shield(loading[0])
+
+        future = asyncio.get_event_loop().create_future()
+        changes = []
+        self._loading[guild_id] = (future, changes)
+        try:
+            async with self._flush_lock:
+                cur = await self.db.execute(self.NAMES, (guild_id,))
+                tags = GuildTags(await cur.fetchall())
+                # creates and deletes that were committed while the query ran
+                for method, *args in changes:
+                    getattr(tags, method)(*args)
+                for name, count in self.pending.get(guild_id, {}).items():
+                    tags.use(name, count)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # nobody might be waiting, don't warn about it
+            raise
+        finally:
+            del self._loading[guild_id]
+        self.guilds[guild_id] = tags
+        future.set_result(tags)
+        return tags
+
+    async def get(self, guild_id, name):
+        """The content of a tag, None if the guild has no tag called `name`."""
+        if (content := self.contents.get((guild_id, name))) is not None:
+            return content
+        if name not in await self.guild(guild_id):
+            return None
+        cur = await self.db.execute(self.CONTENT, (guild_id, name))
+        if (row := await cur.fetchone()) is None:
+            return None
+        self.contents[(guild_id, name)] = row[0]
+        return row[0]
+
+    async def suggest(self, guild_id, name, limit=5):
+        return (await self.guild(guild_id)).suggest(name, limit)
+
+    def _change(self, guild_id, method, *args):
+        if (tags := self.guilds.peek(guild_id)) is not None:
+            getattr(tags, method)(*args)
+        if (loading := self._loading.get(guild_id)) is not None:
+            loading[1].append((method, *args))
+
+    def add(self, guild_id, name, content):
+        self.contents[(guild_id, name)] = content
+        self._change(guild_id, "add", name)
+
+    def add_many(self, guild_id, uses):
+        """Adds the tags of a bulk insert (a `name -> uses` mapping) without caching their contents."""
+        for name, count in uses.items():
+            self._change(guild_id, "add", name, count)
+
+    def remove(self, guild_id, name):
+        self.contents.pop((guild_id, name), None)
+        self.pending.get(guild_id, {}).pop(name, None)
+        self._change(guild_id, "remove", name)
+
+    def use(self, guild_id, name):
+        self.pending.setdefault(guild_id, Counter())[name] += 1
+        if (tags := self.guilds.peek(guild_id)) is not None:
+            tags.use(name)
+
+    async def flush(self):
+        """Writes the counted uses to `tag_uses`, returns how many tags were updated."""
+        async with self._flush_lock:
+            pending, self.pending = self.pending, {}
+            rows = [
+                (count, guild_id, name)
+                for guild_id, counts in pending.items()
+                for name, count in counts.items()
+            ]
+            if not rows:
+                return 0
+            try:
+                await self.writer.transaction((Statement(self.USES, rows, True),))
+            except Exception:
+                for guild_id, counts in pending.items():
+                    self.pending.setdefault(guild_id, Counter()).update(counts)
+                raise
+            self.flushed_uses += sum(row[0] for row in rows)
+            return len(rows)
@@ -0,0 +1,72 @@
+from discord.ext import commands
+
+
+class InsufficientFunds(commands.BadArgument):
+    def __init__(self, user_id, needed, available):
+        self.user_id = user_id
+        self.needed = needed
+        self.available = available
+        super().__init__(
+            f"You don't have that much coins! You need ⛻{needed:,} but only have ⛻{available:,}."
+        )
+
+
+class TransferEngine:
+    """Applies wallet changes atomically on top of `currencyData`.
+
+    Every operation loads the accounts it touches with `get_accounts`, which
+    only returns once every copy is the live one, then checks the balances and
+    changes them without awaiting in between. Nothing else can run on the event
+    loop in that stretch, so two transfers can't both spend the same coins and
+    no lock is needed. The changes are marked dirty and reach `currency_data`
+    with the next batched `currencyData.flush`.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.transfers = 0
+        self.rejected = 0
+
+    async def _accounts(self, *user_ids):
+        accounts = await self.data.get_accounts(user_ids)
+        for user_id, account in zip(user_ids, accounts):
+            if account is None:
+                raise KeyError(user_id)
+        return accounts
+
+    def _check(self, user_id, account, amount):
+        if account["wallet"] < amount:
+            self.rejected += 1
+            raise InsufficientFunds(user_id, amount, account["wallet"])
+
+    async def transfer(self, sender_id, receiver_id, amount, received=None, reason="transfer"):
+        """Moves `amount` out of the sender's wallet and `received` (defaults to `amount`, less
+        after tax) into the receiver's. Returns both new balances."""
+        if amount < 0 or sender_id == receiver_id:
+            raise ValueError("Transfers go from one account to another and can't be negative")
+        received = amount if received is None else received
+        sender, receiver = await self._accounts(sender_id, receiver_id)
+        self._check(sender_id, sender, amount)
+        sender["wallet"] -= amount
+        receiver["wallet"] += received
+        self.data.mark_dirty(sender_id, "wallet")
+        self.data.mark_dirty(receiver_id, "wallet")
+        self.data.record(sender_id, "wallet", -amount, reason)
+        self.data.record(receiver_id, "wallet", received, reason)
+        self.data.bot.leaderboard.update(sender_id, sender)
+        self.data.bot.leaderboard.update(receiver_id, receiver)
+        self.transfers += 1
+        return sender["wallet"], receiver["wallet"]
+
+    async def adjust(self, user_id, amount, reason=None):
+        """Adds `amount` (which can be negative) to a wallet, never letting it go below zero.
+        Returns the new balance."""
+        (account,) = await self._accounts(user_id)
+        if amount < 0:
+            self._check(user_id, account, -amount)
+        account["wallet"] += amount
+        self.data.mark_dirty(user_id, "wallet")
+        self.data.record(user_id, "wallet", amount, reason)
+        self.data.bot.leaderboard.update(user_id, account)
+        self.transfers += 1
+        return account["wallet"]
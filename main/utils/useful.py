@@ -1,379 +1,701 @@
-import asyncio
-import functools
-from os import stat
-import re
-import sqlite3
-import sys
-import traceback
-from datetime import datetime
-import aiohttp
-import discord
-from discord.ext import commands, menus
-from discord.ext.menus import First, Last
-from discord.utils import maybe_coroutine
-from utils.checks import can_execute_action
-
-PAGE_REGEX = r'(Page)?(\s)?((\[)?((?P<current>\d+)/(?P<last>\d+))(\])?)'
-
-# ---Useful classes
-class BaseMenu(menus.MenuPages):
-    def __init__(self, source, *, generate_page=True, **kwargs):
-        super().__init__(source, delete_message_after=kwargs.pop('delete_message_after', True), **kwargs)
-        self.info = False
-        self._generate_page = generate_page
-    
-    @menus.button('◀️', position=First(1))
-    async def _go_before(self, payload):
-        await self.show_checked_page(self.current_page - 1)
-    @menus.button('▶️', position=Last(0))
-    async def _go_next(self, payload):
-        await self.show_checked_page(self.current_page + 1)
-    @menus.button('⏹️', position=First(2))
-    async def _stop(self, payload):
-        self.stop()
-
-    async def _get_kwargs_format_page(self, page):
-        value = await discord.utils.maybe_coroutine(self._source.format_page, self, page)
-        if self._generate_page:
-            value = self.generate_page(value, self._source.get_max_pages())
-        if isinstance(value, dict):
-            return value
-        elif isinstance(value, str):
-            return { 'content': value, 'embed': None }
-        elif isinstance(value, discord.Embed):
-            return { 'embed': value, 'content': None }
-
-    async def _get_kwargs_from_page(self, page):
-        dicts = await self._get_kwargs_format_page(page)
-        dicts.update({'allowed_mentions': discord.AllowedMentions(replied_user=False)})
-        return dicts
-
-    def generate_page(self, content, maximum):
-        if maximum > 0:
-            page = f"Page {self.current_page + 1}/{maximum}"
-            if isinstance(content, discord.Embed):
-                if embed_dict := getattr(content, "_author", None):
-                    if not re.match(PAGE_REGEX, embed_dict["name"]):
-                        embed_dict["name"] += f"[{page.replace('Page ', '')}]"
-                    return content
-                return content.set_author(name=page)
-            elif isinstance(content, str) and not re.match(PAGE_REGEX, content):
-                return f"{page}\n{content}"
-        return content
-
-    async def send_initial_message(self, ctx, channel):
-        page = await self._source.get_page(0)
-        kwargs = await self._get_kwargs_from_page(page)
-        return await ctx.reply(**kwargs)
-
-class detect(aiohttp.ClientSession):
-    async def find(self, url):
-        source = str(await (await super().get(url)).content.read()).lower()
-        phrases = ["rickroll", "rick roll", "rick astley", "never gonna give you up"]
-        await super().close()
-        return bool(re.findall("|".join(phrases), source, re.MULTILINE))
-
-
-class ListCall(list):
-    """Quick data structure for calling every element in the array regardless of awaitable or not"""
-
-    def append(self, rhs):
-        return super().append(rhs)
-
-    def call(self, *args, **kwargs):
-        return asyncio.gather(
-            *(maybe_coroutine(func, *args, **kwargs) for func in self)
-        )
-
-
-class Embed(discord.Embed):
-    def __init__(self, color=0x2F3136, fields=(), field_inline=False, **kwargs):
-        super().__init__(color=color, **kwargs)
-        for n, v in fields:
-            self.add_field(name=n, value=v, inline=field_inline)
-
-
-class currencyData:
-    def __init__(self, bot):
-        self.bot = bot
-
-    async def create_account(self, user_id):
-        if user_id in self.bot.cache["users"]:
-            return False
-        query = "INSERT INTO currency_data (user_id) VALUES (?)"
-        try:
-            await self.bot.db.execute(query, (user_id,))
-            await self.bot.db.commit()
-            self.bot.cache["users"].setdefault(
-                user_id,
-                {
-                    "wallet": 200,
-                    "bank": 200,
-                    "max_bank": 200,
-                    "boost": 1,
-                    "exp": 0,
-                    "lvl": 0,
-                },
-            )
-            return True
-        except sqlite3.IntegrityError:
-            return False
-
-    async def get_data(self, user_id, mode="wallet"):
-        return self.bot.cache["users"][user_id][mode]
-
-    async def update_data(self, user_id, amount: int, mode="wallet"):
-        self.bot.cache["users"][user_id][mode] += amount
-        return True
-
-    async def has_item(self, user_id, item):
-        item = item.lower()
-        query = """
-                SELECT item_id
-                FROM user_inventory
-                INNER JOIN item_info
-                USING(item_id)
-                WHERE user_id = ? AND lower(item_name) = ?
-                """
-        cur = await self.bot.db.execute(query, (user_id, item))
-        data = await cur.fetchone()
-        return bool(data)
-
-
-class Cooldown:
-    def __init__(
-        self,
-        rate: int,
-        per: float,
-        alter_rate: int,
-        alter_per: float,
-        bucket: commands.BucketType,
-    ):
-        self.default_mapping = commands.CooldownMapping.from_cooldown(rate, per, bucket)
-        self.altered_mapping = commands.CooldownMapping.from_cooldown(
-            alter_rate, alter_per, bucket
-        )
-
-    def __call__(self, ctx: commands.Context):
-        key, key1 = (ctx.author.id, getattr(ctx.guild, "id", None))
-        if key in ctx.bot.cache["premium_users"] or key1 in ctx.bot.cache["premium_users"]:
-            ctx.bucket = self.altered_mapping.get_bucket(ctx.message)
-        else:
-            ctx.bucket = self.default_mapping.get_bucket(ctx.message)
-        retry_after = ctx.bucket.update_rate_limit()
-        if retry_after:
-            raise commands.CommandOnCooldown(ctx.bucket, retry_after)
-        return True
-
-class fuzzy:
-
-    @staticmethod
-    def finder(to_find, collection, *, key=None, lazy=True):
-        suggestions = []
-        text = str(to_find)
-        pat = '.*?'.join(map(re.escape, text))
-        regex = re.compile(pat, flags=re.IGNORECASE)
-        for item in collection:
-            to_search = key(item) if key else item
-            r = regex.search(to_search)
-            if r:
-                suggestions.append((len(r.group()), r.start(), item))
-
-        def sort_key(tup):
-            if key:
-                return tup[0], tup[1], key(tup[2])
-            return tup
-
-        if lazy:
-            return (z for _, _, z in sorted(suggestions, key=sort_key))
-        else:
-            return [z for _, _, z in sorted(suggestions, key=sort_key)]
-
-# ---Useful functions
-def pages(per_page=1, show_page=True):
-    """Compact ListPageSource that was originally made teru but was modified"""
-    def page_source(coro):
-        async def create_page_header(self, menu, entry):
-            result = await discord.utils.maybe_coroutine(coro, self, menu, entry)
-            return menu.generate_page(result, self._max_pages)
-
-        def __init__(self, list_pages):
-            super(self.__class__, self).__init__(list_pages, per_page=per_page)
-        kwargs = {
-            '__init__': __init__,
-            'format_page': (coro, create_page_header)[show_page]
-        }
-        return type(coro.__name__, (menus.ListPageSource,), kwargs)
-    return page_source
-
-def roman_num(num):
-    num_map = [
-        (1000, "M"),
-        (900, "CM"),
-        (500, "D"),
-        (400, "CD"),
-        (100, "C"),
-        (90, "XC"),
-        (50, "L"),
-        (40, "XL"),
-        (10, "X"),
-        (9, "IX"),
-        (5, "V"),
-        (4, "IV"),
-        (1, "I"),
-    ]
-
-    roman = ""
-    while num > 0:
-        for i, r in num_map:
-            while num >= i:
-                roman += r
-                num -= i
-    return roman
-
-
-def progress_bar(progress):
-    progress = round(progress / 10)
-    return ("■" * progress) + ("□" * (10 - progress))
-
-
-async def convert_to_int(amount, max_amt):
-    amount = amount.replace("max", f"{max_amt}")
-    amount = amount.replace("all", f"{max_amt}")
-    amount = re.sub(r"[^0-9ekEK.]", r"", amount)
-    amount = amount.replace(".0", "")
-    amount = amount.replace("k", "*1000")
-    amount = amount.replace("e", "*10**")
-    try:
-        return int(eval(amount))
-    except Exception:
-        raise commands.BadArgument("That is not a valid amount!")
-
-
-def event_check(func):
-    """Event decorator check."""
-
-    def check(method):
-        method.callback = method
-
-        @functools.wraps(method)
-        async def wrapper(*args, **kwargs):
-            if await discord.utils.maybe_coroutine(func, *args, **kwargs):
-                await method(*args, **kwargs)
-
-        return wrapper
-
-    return check
-
-
-def call(func, *args, exception=Exception, ret=False, **kwargs):
-    """one liner method that handles all errors in a single line which returns None, or Error instance depending on ret
-    value.
-    """
-    try:
-        return func(*args, **kwargs)
-    except exception as e:
-        return (None, e)[ret]
-
-
-def print_exception(text, error):
-    """Prints the exception with proper traceback."""
-    print(text, file=sys.stderr)
-    traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
-    etype = type(error)
-    trace = error.__traceback__
-    lines = traceback.format_exception(etype, error, trace)
-    return "".join(lines)
-
-
-def wait_ready(bot=None):
-    async def predicate(*args, **_):
-        nonlocal bot
-        self = args[0] if args else None
-        if isinstance(self, commands.Cog):
-            bot = bot or self.bot
-        if not isinstance(bot, commands.Bot):
-            raise Exception(
-                f"Bot must derived from commands.Bot not {bot.__class__.__name__}"
-            )
-        await bot.wait_until_ready()
-        return True
-
-    return event_check(predicate)
-
-
-async def get_grole(self, ctx):
-
-    cur = await self.bot.db.execute(
-        "SELECT grole FROM guild_config WHERE guild_id=?", (ctx.guild.id,)
-    )
-    data = await cur.fetchone()
-    return data[0]
-
-
-async def get_frozen(self, guild: discord.Guild, member: discord.Member):
-    cur = await self.bot.db.execute(
-        "SELECT * FROM frozen_names WHERE guild_id = ? AND user_id = ?",
-        (guild.id, member.id),
-    )
-    rows = await cur.fetchall()
-    return rows
-
-
-async def send_traceback(
-    destination: discord.abc.Messageable, ctx: commands.Context, verbosity: int, *exc_info
-):
-    """
-    Sends a traceback of an exception to a destination.
-    Used when REPL fails for any reason.
-
-    :param destination: Where to send this information to
-    :param verbosity: How far back this traceback should go. 0 shows just the last stack.
-    :param exc_info: Information about this exception, from sys.exc_info or similar.
-    :return: The last message sent
-    """
-
-    base = f"An error occured while **{ctx.author}** [{ctx.author.id} ran the command `{ctx.command.name}` at {datetime.utcnow().strftime('%H:%M:%S')} UTC\n"
-    
-    etype, value, trace = exc_info
-
-    traceback_content = "".join(
-        traceback.format_exception(etype, value, trace, verbosity)
-    ).replace("``", "`\u200b`")
-
-    final = base + f"```py\n{traceback_content}```"
-    await destination.send(final)
-    return final
-
-
-# ---Converters
-class RoleConvert(commands.Converter):
-    async def convert(self, ctx, argument):
-        try:
-            return await commands.RoleConverter().convert(ctx, argument)
-        except commands.BadArgument:
-            role_to_return = discord.utils.find(
-                lambda x: x.name.lower() == argument.lower(), ctx.guild.roles
-            )
-            if role_to_return is not None:
-                return role_to_return
-
-
-class MemberConvert(commands.Converter):
-    async def convert(self, ctx, argument):
-        try:
-            m = await commands.MemberConverter().convert(ctx, argument)
-        except commands.BadArgument:
-            m = discord.utils.find(
-                lambda x: x.name.lower() == argument.lower(), ctx.guild.members
-            )
-            if m is None:
-                raise commands.BadArgument(
-                    f"{argument} is not a valid member or member ID"
-                )
-
-        if not can_execute_action(ctx, ctx.author, m):
-            raise commands.BadArgument(
-                f"{ctx.bot.redTick} You cannot do this action on this user due to role hierarchy."
-            )
-        return m
+import asyncio
+import functools
+import logging
+from os import stat
+import re
+import sqlite3
+import sys
+import time
+import traceback
+from datetime import datetime
+from fractions import Fraction
+import aiohttp
+import discord
+from discord.ext import commands, menus
+from discord.ext.menus import First, Last
+from discord.utils import maybe_coroutine
+from utils.cache import CacheNamespace
+from utils.checks import can_execute_action
+from utils.db import Statement
+
+PAGE_REGEX = r'(Page)?(\s)?((\[)?((?P<current>\d+)/(?P<last>\d+))(\])?)'
+
+# ---Useful classes
+class BaseMenu(menus.MenuPages):
+    def __init__(self, source, *, generate_page=True, **kwargs):
+        super().__init__(source, delete_message_after=kwargs.pop('delete_message_after', True), **kwargs)
+        self.info = False
+        self._generate_page = generate_page
+    
+    @menus.button('◀️', position=First(1))
+    async def _go_before(self, payload):
+        await self.show_checked_page(self.current_page - 1)
+    @menus.button('▶️', position=Last(0))
+    async def _go_next(self, payload):
+        await self.show_checked_page(self.current_page + 1)
+    @menus.button('⏹️', position=First(2))
+    async def _stop(self, payload):
+        self.stop()
+
+    async def _get_kwargs_format_page(self, page):
+        value = await discord.utils.maybe_coroutine(self._source.format_page, self, page)
+        if self._generate_page:
+            value = self.generate_page(value, self._source.get_max_pages())
+        if isinstance(value, dict):
+            return value
+        elif isinstance(value, str):
+            return { 'content': value, 'embed': None }
+        elif isinstance(value, discord.Embed):
+            return { 'embed': value, 'content': None }
+
+    async def _get_kwargs_from_page(self, page):
+        dicts = await self._get_kwargs_format_page(page)
+        dicts.update({'allowed_mentions': discord.AllowedMentions(replied_user=False)})
+        return dicts
+
+    def generate_page(self, content, maximum):
+        if maximum > 0:
+            page = f"Page {self.current_page + 1}/{maximum}"
+            if isinstance(content, discord.Embed):
+                if embed_dict := getattr(content, "_author", None):
+                    if not re.match(PAGE_REGEX, embed_dict["name"]):
+                        embed_dict["name"] += f"[{page.replace('Page ', '')}]"
+                    return content
+                return content.set_author(name=page)
+            elif isinstance(content, str) and not re.match(PAGE_REGEX, content):
+                return f"{page}\n{content}"
+        return content
+
+    async def send_initial_message(self, ctx, channel):
+        page = await self._source.get_page(0)
+        kwargs = await self._get_kwargs_from_page(page)
+        return await ctx.reply(**kwargs)
+
+class detect(aiohttp.ClientSession):
+    async def find(self, url):
+        source = str(await (await super().get(url)).content.read()).lower()
+        phrases = ["rickroll", "rick roll", "rick astley", "never gonna give you up"]
+        await super().close()
+        return bool(re.findall("|".join(phrases), source, re.MULTILINE))
+
+
+class ListCall(list):
+    """Quick data structure for calling every element in the array regardless of awaitable or not"""
+
+    def append(self, rhs):
+        return super().append(rhs)
+
+    def call(self, *args, **kwargs):
+        return asyncio.gather(
+            *(maybe_coroutine(func, *args, **kwargs) for func in self)
+        )
+
+
+class Embed(discord.Embed):
+    def __init__(self, color=0x2F3136, fields=(), field_inline=False, **kwargs):
+        super().__init__(color=color, **kwargs)
+        for n, v in fields:
+            self.add_field(name=n, value=v, inline=field_inline)
+
+
+class currencyData:
+    """Keeps the currency accounts in `bot.cache["users"]` and the inventories in
+    `bot.cache["inventories"]`, and writes both back in batches.
+
+    Every `update_data` marks the account and field as dirty and every `add_item`
+    marks the inventory slot as dirty, `flush` then only writes what changed.
+    Accounts and inventories can be evicted from the cache at any time, they are
+    loaded again on their next use. Dirty ones that got evicted are parked in
+    `evicted` / `evicted_inventories` until they have been flushed.
+    """
+
+    FIELDS = ("wallet", "bank", "max_bank", "boost", "exp", "lvl", "prestige")
+    FIELD_BITS = {field: 1 << i for i, field in enumerate(FIELDS)}
+    EXP_CHUNK = 1000
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.dirty = {}
+        self.evicted = {}
+        self.inventory_dirty = {}
+        self.evicted_inventories = {}
+        self._flushing = {}
+        self._flushing_inventories = {}
+        self._loading = {}
+        self._loading_inventories = {}
+        self.last_flush = None
+        users = bot.cache.setdefault("users", {})
+        if isinstance(users, CacheNamespace):
+            users.on_evict = self.on_evict
+        inventories = bot.cache.setdefault("inventories", {})
+        if isinstance(inventories, CacheNamespace):
+            inventories.on_evict = self.on_evict_inventory
+
+    # the database is stale for anything that is dirty or still being written
+    def on_evict(self, user_id, account):
+        if user_id in self.dirty or user_id in self._flushing:
+            self.evicted[user_id] = account
+
+    def on_evict_inventory(self, user_id, inventory):
+        if user_id in self.inventory_dirty or user_id in self._flushing_inventories:
+            self.evicted_inventories[user_id] = inventory
+
+    def mark_dirty(self, user_id, *fields):
+        mask = self.dirty.get(user_id, 0)
+        for field in fields:
+            mask |= self.FIELD_BITS[field]
+        self.dirty[user_id] = mask
+
+    @classmethod
+    def fields_of(cls, mask):
+        return tuple(field for field in cls.FIELDS if mask & cls.FIELD_BITS[field])
+
+    async def get_account(self, user_id):
+        """Returns the cached account of a user, loading it if needed. Returns None if the user has no account."""
+        users = self.bot.cache["users"]
+        if (account := users.get(user_id)) is not None:
+            return account
+        if (account := self.evicted.pop(user_id, None)) is not None:
+            users[user_id] = account
+            return account
+
+        return await self._load(self._loading, user_id, self._load_account)
+
+    async def _load_account(self, user_id):
+        query = "SELECT * FROM currency_data WHERE user_id = ?"
+        cur = await self.bot.db.execute(query, (user_id,))
+        row = await cur.fetchone()
+        if row is None:
+            return None
+        return self.bot.cache["users"].setdefault(user_id, dict(zip(self.FIELDS, row[1:8])))
+
+    @staticmethod
+    async def _load(loading, user_id, load):
+        """Runs `load(user_id)` at most once at a time per user, everyone else asking meanwhile gets its result.
+        Two loads of one user could otherwise race: if the first copy is changed and evicted while the
+        second query runs, the second one would cache what the database held before the change."""
+        if (future := loading.get(user_id)) is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_event_loop().create_future()
+        loading[user_id] = future
+        try:
+            result = await load(user_id)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # nobody might be waiting, don't warn about it
+            raise
+        finally:
+            del loading[user_id]
+        future.set_result(result)
+        return result
+
+    def is_live(self, user_id, account):
+        """Whether `account` is still the copy that gets flushed for `user_id`."""
+        users = self.bot.cache["users"]
+        peek = getattr(users, "peek", users.get)
+        return peek(user_id) is account or self.evicted.get(user_id) is account
+
+    async def get_accounts(self, user_ids):
+        """Loads several accounts so they can be changed together without awaiting in between.
+        Loading one account can evict another clean one, so it retries until every copy is live."""
+        while True:
+            accounts = [await self.get_account(user_id) for user_id in user_ids]
+            if all(
+                account is None or self.is_live(user_id, account)
+                for user_id, account in zip(user_ids, accounts)
+            ):
+                return accounts
+
+    async def has_account(self, user_id):
+        return await self.get_account(user_id) is not None
+
+    async def create_account(self, user_id):
+        if await self.get_account(user_id) is not None:
+            return False
+        query = "INSERT INTO currency_data (user_id) VALUES (?)"
+        try:
+            await self.bot.writer.execute(query, (user_id,))
+            account = self.bot.cache["users"].setdefault(
+                user_id,
+                {
+                    "wallet": 200,
+                    "bank": 200,
+                    "max_bank": 200,
+                    "boost": 1,
+                    "exp": 0,
+                    "lvl": 0,
+                    "prestige": 0,
+                },
+            )
+            self.bot.leaderboard.update(user_id, account)
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    async def get_data(self, user_id, mode="wallet"):
+        if (account := await self.get_account(user_id)) is None:
+            raise KeyError(user_id)
+        return account[mode]
+
+    def record(self, user_id, field, delta, reason=None):
+        """Appends a change to the economy ledger."""
+        self.bot.ledger.record(user_id, field, delta, reason)
+
+    async def update_data(self, user_id, amount: int, mode="wallet", reason=None):
+        if (account := await self.get_account(user_id)) is None:
+            raise KeyError(user_id)
+        account[mode] += amount
+        self.dirty[user_id] = self.dirty.get(user_id, 0) | self.FIELD_BITS[mode]
+        self.record(user_id, mode, amount, reason)
+        self.bot.leaderboard.update(user_id, account)
+        return True
+
+    async def add_exp(self, pending):
+        """Applies a batch of pending exp (`{user_id: exp}`) in a single pass.
+        Every exp point adds 100 to max_bank, every level crossed adds 0.01 boost,
+        several levels can be crossed at once. Returns the IDs of the users that levelled up.
+        Users are taken out of `pending` once applied, so after an error it holds the exp still to apply."""
+        levelled_up = []
+        user_ids = list(pending)
+        # chunks stay well below the size of the users cache, so `get_accounts` can hold a whole chunk
+        for i in range(0, len(user_ids), self.EXP_CHUNK):
+            chunk = user_ids[i:i + self.EXP_CHUNK]
+            accounts = await self.get_accounts(chunk)
+            levelled_up += self._apply_exp(chunk, accounts, pending)
+            for user_id in chunk:
+                del pending[user_id]
+        return levelled_up
+
+    def _apply_exp(self, user_ids, accounts, pending):
+        """The batched pass over accounts that are all live, without awaiting."""
+        found = [(user_id, account) for user_id, account in zip(user_ids, accounts) if account is not None]
+        user_ids = [user_id for user_id, _ in found]
+        accounts = [account for _, account in found]
+        deltas = [pending[user_id] for user_id in user_ids]
+        exps = [account["exp"] + delta for account, delta in zip(accounts, deltas)]
+        # exp > (lvl + 1) * 100 levels you up, so the level reached is (exp - 1) // 100
+        lvls = [max(account["lvl"], (exp - 1) // 100) for account, exp in zip(accounts, exps)]
+        gained = [lvl - account["lvl"] for account, lvl in zip(accounts, lvls)]
+
+        levelled_up = []
+        exp_mask = self.FIELD_BITS["exp"] | self.FIELD_BITS["max_bank"]
+        level_mask = exp_mask | self.FIELD_BITS["lvl"] | self.FIELD_BITS["boost"]
+        for user_id, account, delta, exp, lvl, levels in zip(
+            user_ids, accounts, deltas, exps, lvls, gained
+        ):
+            self.record(user_id, "exp", exp - account["exp"], "exp")
+            self.record(user_id, "max_bank", delta * 100, "exp")
+            account["exp"] = exp
+            account["max_bank"] += delta * 100
+            mask = exp_mask
+            if levels:
+                boost = round(account["boost"] + 0.01 * levels, 2)
+                self.record(user_id, "lvl", levels, "level up")
+                self.record(user_id, "boost", round(boost - account["boost"], 2), "level up")
+                account["lvl"] = lvl
+                account["boost"] = boost
+                mask = level_mask
+                levelled_up.append(user_id)
+            self.dirty[user_id] = self.dirty.get(user_id, 0) | mask
+            self.bot.leaderboard.update(user_id, account)
+        return levelled_up
+
+    async def get_inventory(self, user_id):
+        """Returns the inventory of a user as a mapping of item ID to amount, loading it if needed."""
+        inventories = self.bot.cache["inventories"]
+        if (inventory := inventories.get(user_id)) is not None:
+            return inventory
+        if (inventory := self.evicted_inventories.pop(user_id, None)) is not None:
+            inventories[user_id] = inventory
+            return inventory
+
+        return await self._load(self._loading_inventories, user_id, self._load_inventory)
+
+    async def _load_inventory(self, user_id):
+        query = "SELECT item_id, amount FROM user_Inventory WHERE user_id = ? AND amount > 0"
+        cur = await self.bot.db.execute(query, (user_id,))
+        rows = await cur.fetchall()
+        return self.bot.cache["inventories"].setdefault(user_id, dict(rows))
+
+    async def add_item(self, user_id, item_id, amount: int):
+        """Adds `amount` (which can be negative) of an item to a user's inventory and returns the new amount."""
+        inventory = await self.get_inventory(user_id)
+        new_amount = inventory.get(item_id, 0) + amount
+        if new_amount > 0:
+            inventory[item_id] = new_amount
+        else:
+            inventory.pop(item_id, None)
+        self.inventory_dirty.setdefault(user_id, set()).add(item_id)
+        return new_amount
+
+    async def has_item(self, user_id, item):
+        if (found := self.bot.catalog.get(item)) is None:
+            return False
+        inventory = await self.get_inventory(user_id)
+        return inventory.get(found.id, 0) > 0
+
+    def _inventory_rows(self, dirty):
+        """Splits the dirty inventory slots into rows to upsert and rows to delete."""
+        inventories = self.bot.cache["inventories"]
+        peek = getattr(inventories, "peek", inventories.get)
+        upserts, deletes = [], []
+        for user_id, item_ids in dirty.items():
+            inventory = peek(user_id)
+            if inventory is None:
+                inventory = self.evicted_inventories.get(user_id)
+            if inventory is None:
+                continue
+            for item_id in item_ids:
+                amount = inventory.get(item_id, 0)
+                if amount > 0:
+                    upserts.append((user_id, item_id, amount))
+                else:
+                    deletes.append((user_id, item_id))
+        return upserts, deletes
+
+    async def flush(self):
+        """Writes the changed fields of every dirty account and inventory slot in one transaction.
+        Accounts are grouped by the fields that changed so every group is a single executemany.
+        The buffered ledger rows go in the same transaction, which moves the ledger watermark.
+        Returns a dict with the amount of rows written and how long it took."""
+        if not self.dirty and not self.inventory_dirty:
+            return None
+        start = time.perf_counter()
+        ledger = self.bot.ledger
+        ledger_rows = ledger.drain()
+        dirty, self.dirty = self.dirty, {}
+        inventory_dirty, self.inventory_dirty = self.inventory_dirty, {}
+        self._flushing, self._flushing_inventories = dirty, inventory_dirty
+        users = self.bot.cache["users"]
+        peek = getattr(users, "peek", users.get)
+        groups = {}
+        for user_id, mask in dirty.items():
+            account = peek(user_id) or self.evicted.get(user_id)
+            if account is None:
+                continue
+            fields = self.fields_of(mask)
+            row = tuple(
+                round(account[field], 2) if field == "boost" else account[field]
+                for field in fields
+            )
+            groups.setdefault(fields, []).append(row + (user_id,))
+        upserts, deletes = self._inventory_rows(inventory_dirty)
+
+        statements = [ledger.statement(ledger_rows)] if ledger_rows else []
+        for fields, rows in groups.items():
+            columns = ", ".join(f"{field} = ?" for field in fields)
+            query = f"UPDATE currency_data SET {columns} WHERE user_id = ?"
+            statements.append(Statement(query, rows, True))
+        if upserts:
+            query = """
+                    INSERT INTO user_Inventory (user_id, item_id, amount)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(user_id, item_id) DO UPDATE SET amount = excluded.amount
+                    """
+            statements.append(Statement(query, upserts, True))
+        if deletes:
+            query = "DELETE FROM user_Inventory WHERE user_id = ? AND item_id = ?"
+            statements.append(Statement(query, deletes, True))
+        statements.append(Statement(ledger.WATERMARK))
+
+        try:
+            await self.bot.writer.transaction(statements)
+        except Exception:
+            # memory stays the source of truth, everything is retried on the next flush
+            for user_id, mask in dirty.items():
+                self.dirty[user_id] = self.dirty.get(user_id, 0) | mask
+            for user_id, item_ids in inventory_dirty.items():
+                self.inventory_dirty.setdefault(user_id, set()).update(item_ids)
+            ledger.restore(ledger_rows)
+            raise
+        finally:
+            self._flushing, self._flushing_inventories = {}, {}
+
+        if ledger_rows:
+            ledger.written(len(ledger_rows), time.perf_counter() - start)
+        for user_id in dirty:
+            if user_id not in self.dirty:
+                self.evicted.pop(user_id, None)
+        for user_id in inventory_dirty:
+            if user_id not in self.inventory_dirty:
+                self.evicted_inventories.pop(user_id, None)
+
+        self.last_flush = {
+            "rows": sum(len(rows) for rows in groups.values()),
+            "inventory_rows": len(upserts) + len(deletes),
+            "ledger_rows": len(ledger_rows),
+            "statements": len(statements),
+            "duration": time.perf_counter() - start,
+            "at": datetime.utcnow(),
+        }
+        logging.info(
+            "Flushed %(rows)s currency rows and %(inventory_rows)s inventory rows "
+            "in %(statements)s statements (%(duration).3fs)",
+            self.last_flush,
+        )
+        return self.last_flush
+
+
+class Cooldown:
+    def __init__(
+        self,
+        rate: int,
+        per: float,
+        alter_rate: int,
+        alter_per: float,
+        bucket: commands.BucketType,
+    ):
+        self.default_mapping = commands.CooldownMapping.from_cooldown(rate, per, bucket)
+        self.altered_mapping = commands.CooldownMapping.from_cooldown(
+            alter_rate, alter_per, bucket
+        )
+
+    def __call__(self, ctx: commands.Context):
+        key, key1 = (ctx.author.id, getattr(ctx.guild, "id", None))
+        if key in ctx.bot.cache["premium_users"] or key1 in ctx.bot.cache["premium_users"]:
+            ctx.bucket = self.altered_mapping.get_bucket(ctx.message)
+        else:
+            ctx.bucket = self.default_mapping.get_bucket(ctx.message)
+        retry_after = ctx.bucket.update_rate_limit()
+        if retry_after:
+            raise commands.CommandOnCooldown(ctx.bucket, retry_after)
+        return True
+
+class fuzzy:
+
+    @staticmethod
+    def finder(to_find, collection, *, key=None, lazy=True):
+        suggestions = []
+        text = str(to_find)
+        pat = '.*?'.join(map(re.escape, text))
+        regex = re.compile(pat, flags=re.IGNORECASE)
+        for item in collection:
+            to_search = key(item) if key else item
+            r = regex.search(to_search)
+            if r:
+                suggestions.append((len(r.group()), r.start(), item))
+
+        def sort_key(tup):
+            if key:
+                return tup[0], tup[1], key(tup[2])
+            return tup
+
+        if lazy:
+            return (z for _, _, z in sorted(suggestions, key=sort_key))
+        else:
+            return [z for _, _, z in sorted(suggestions, key=sort_key)]
+
+# ---Useful functions
+def pages(per_page=1, show_page=True):
+    """Compact ListPageSource that was originally made teru but was modified"""
+    def page_source(coro):
+        async def create_page_header(self, menu, entry):
+            result = await discord.utils.maybe_coroutine(coro, self, menu, entry)
+            return menu.generate_page(result, self._max_pages)
+
+        def __init__(self, list_pages):
+            super(self.__class__, self).__init__(list_pages, per_page=per_page)
+        kwargs = {
+            '__init__': __init__,
+            'format_page': (coro, create_page_header)[show_page]
+        }
+        return type(coro.__name__, (menus.ListPageSource,), kwargs)
+    return page_source
+
+def roman_num(num):
+    num_map = [
+        (1000, "M"),
+        (900, "CM"),
+        (500, "D"),
+        (400, "CD"),
+        (100, "C"),
+        (90, "XC"),
+        (50, "L"),
+        (40, "XL"),
+        (10, "X"),
+        (9, "IX"),
+        (5, "V"),
+        (4, "IV"),
+        (1, "I"),
+    ]
+
+    roman = ""
+    while num > 0:
+        for i, r in num_map:
+            while num >= i:
+                roman += r
+                num -= i
+    return roman
+
+
+def progress_bar(progress):
+    progress = round(progress / 10)
+    return ("■" * progress) + ("□" * (10 - progress))
+
+
+AMOUNT_REGEX = re.compile(
+    r"(?P<number>\d+(?:\.\d*)?|\.\d+)(?:e(?P<exponent>\d{1,2}))?(?P<suffix>[kmb])?(?P<percent>%)?"
+)
+AMOUNT_SUFFIXES = {None: 1, "k": 10**3, "m": 10**6, "b": 10**9}
+AMOUNT_KEYWORDS = {"max": 1, "all": 1, "half": Fraction(1, 2)}
+MAX_AMOUNT_LENGTH = 32
+MAX_AMOUNT = 10**15
+
+
+def parse_amount(amount: str, max_amt: int) -> int:
+    """Turns an amount typed by a user into an int.
+    Supports `5000`, `1,000`, `2.5k`, `3m`, `1b`, `5e5`, `max`/`all`/`half` and `50%` (of `max_amt`).
+    Decimals are rounded down. Every input costs about the same, nothing is evaluated."""
+    amount = amount.strip().lower()
+    if len(amount) > MAX_AMOUNT_LENGTH:
+        raise commands.BadArgument("That amount is way too long!")
+    amount = amount.replace(",", "").replace("_", "").replace("⛻", "").replace(" ", "")
+    if amount in AMOUNT_KEYWORDS:
+        return int(max_amt * AMOUNT_KEYWORDS[amount])
+    if (match := AMOUNT_REGEX.fullmatch(amount)) is None:
+        raise commands.BadArgument(
+            "That is not a valid amount! Try something like `500`, `2.5k`, `1e6`, `50%` or `max`."
+        )
+    value = Fraction(match["number"]) * AMOUNT_SUFFIXES[match["suffix"]]
+    if match["exponent"]:
+        value *= 10 ** int(match["exponent"])
+    if match["percent"]:
+        if value > 100:
+            raise commands.BadArgument("You can't use more than 100% of it!")
+        value = value * max_amt / 100
+    if value > MAX_AMOUNT:
+        raise commands.BadArgument(f"That amount is too big! The most you can use is ⛻{MAX_AMOUNT:,}.")
+    return int(value)
+
+
+async def convert_to_int(amount, max_amt):
+    return parse_amount(amount, max_amt)
+
+
+def event_check(func):
+    """Event decorator check."""
+
+    def check(method):
+        method.callback = method
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            if await discord.utils.maybe_coroutine(func, *args, **kwargs):
+                await method(*args, **kwargs)
+
+        return wrapper
+
+    return check
+
+
+def call(func, *args, exception=Exception, ret=False, **kwargs):
+    """one liner method that handles all errors in a single line which returns None, or Error instance depending on ret
+    value.
+    """
+    try:
+        return func(*args, **kwargs)
+    except exception as e:
+        return (None, e)[ret]
+
+
+def print_exception(text, error):
+    """Prints the exception with proper traceback."""
+    print(text, file=sys.stderr)
+    traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+    etype = type(error)
+    trace = error.__traceback__
+    lines = traceback.format_exception(etype, error, trace)
+    return "".join(lines)
+
+
+def wait_ready(bot=None):
+    async def predicate(*args, **_):
+        nonlocal bot
+        self = args[0] if args else None
+        if isinstance(self, commands.Cog):
+            bot = bot or self.bot
+        if not isinstance(bot, commands.Bot):
+            raise Exception(
+                f"Bot must derived from commands.Bot not {bot.__class__.__name__}"
+            )
+        await bot.wait_until_ready()
+        return True
+
+    return event_check(predicate)
+
+
+async def get_grole(self, ctx):
+
+    cur = await self.bot.db.execute(
+        "SELECT grole FROM guild_config WHERE guild_id=?", (ctx.guild.id,)
+    )
+    data = await cur.fetchone()
+    return data[0]
+
+
+async def get_frozen(self, guild: discord.Guild, member: discord.Member):
+    cur = await self.bot.db.execute(
+        "SELECT * FROM frozen_names WHERE guild_id = ? AND user_id = ?",
+        (guild.id, member.id),
+    )
+    rows = await cur.fetchall()
+    return rows
+
+
+async def send_traceback(
+    destination: discord.abc.Messageable, ctx: commands.Context, verbosity: int, *exc_info
+):
+    """
+    Sends a traceback of an exception to a destination.
+    Used when REPL fails for any reason.
+
+    :param destination: Where to send this information to
+    :param verbosity: How far back this traceback should go. 0 shows just the last stack.
+    :param exc_info: Information about this exception, from sys.exc_info or similar.
+    :return: The last message sent
+    """
+
+    base = f"An error occured while **{ctx.author}** [{ctx.author.id} ran the command `{ctx.command.name}` at {datetime.utcnow().strftime('%H:%M:%S')} UTC\n"
+    
+    etype, value, trace = exc_info
+
+    traceback_content = "".join(
+        traceback.format_exception(etype, value, trace, verbosity)
+    ).replace("``", "`\u200b`")
+
+    final = base + f"```py\n{traceback_content}```"
+    await destination.send(final)
+    return final
+
+
+# ---Converters
+class RoleConvert(commands.Converter):
+    async def convert(self, ctx, argument):
+        try:
+            return await commands.RoleConverter().convert(ctx, argument)
+        except commands.BadArgument:
+            role_to_return = discord.utils.find(
+                lambda x: x.name.lower() == argument.lower(), ctx.guild.roles
+            )
+            if role_to_return is not None:
+                return role_to_return
+
+
+class MemberConvert(commands.Converter):
+    async def convert(self, ctx, argument):
+        try:
+            m = await commands.MemberConverter().convert(ctx, argument)
+        except commands.BadArgument:
+            m = discord.utils.find(
+                lambda x: x.name.lower() == argument.lower(), ctx.guild.members
+            )
+            if m is None:
+                raise commands.BadArgument(
+                    f"{argument} is not a valid member or member ID"
+                )
+
+        if not can_execute_action(ctx, ctx.author, m):
+            raise commands.BadArgument(
+                f"{ctx.bot.redTick} You cannot do this action on this user due to role hierarchy."
+            )
+        return m